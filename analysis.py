@@ -0,0 +1,60 @@
+"""
+Click interval analytics for the CPS test.
+
+After a test has finished, its click timestamps (perf_counter nanoseconds) are analyzed with NumPy array operations (no Python loops):
+inter-click intervals, their standard deviation and percentiles, the peak CPS over a sliding 1 second window and the burst segments (runs of
+clicks much faster than the user's usual pace). This tells a consistent clicker apart from one that bursts at the end of the test, which
+the average CPS alone can't do.
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+NS_PER_SECOND = 1_000_000_000
+
+
+@dataclass
+class ClickStats:
+    clicks: int = 0
+    mean_interval: float = 0.0
+    jitter: float = 0.0
+    p50: float = 0.0
+    p95: float = 0.0
+    p99: float = 0.0
+    peak_cps: float = 0.0
+    #Each burst is a (first click index, last click index, CPS during the burst) tuple
+    bursts: list = field(default_factory=list)
+
+
+def analyze_clicks(timestamps, window=NS_PER_SECOND, burst_factor=0.6, min_burst_clicks=5):
+    """Analyze the click timestamps (any sequence or buffer of nanosecond integers, sorted from the oldest to the newest). The intervals,
+    jitter (standard deviation of the intervals) and percentiles are returned in seconds. A burst is a run of at least min_burst_clicks
+    clicks whose intervals are all shorter than burst_factor times the median interval."""
+    timestamps = np.asarray(timestamps, dtype=np.uint64)
+    stats = ClickStats(clicks=len(timestamps))
+    if len(timestamps) < 2:
+        return stats
+
+    #Inter-click intervals, in seconds
+    intervals = np.diff(timestamps).astype(np.float64) / NS_PER_SECOND
+    stats.mean_interval = float(intervals.mean())
+    stats.jitter = float(intervals.std())
+    stats.p50, stats.p95, stats.p99 = (float(x) for x in np.percentile(intervals, [50, 95, 99]))
+
+    #Peak CPS: the most clicks inside any window starting at a click
+    window_ends = np.searchsorted(timestamps, timestamps + np.uint64(window), side="left")
+    counts = window_ends - np.arange(len(timestamps))
+    stats.peak_cps = float(counts.max()) * NS_PER_SECOND / window
+
+    #Bursts: runs of intervals shorter than a fraction of the median interval
+    fast = np.concatenate(([0], (intervals < burst_factor * stats.p50).astype(np.int8), [0]))
+    edges = np.diff(fast)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    keep = ends - starts + 1 >= min_burst_clicks
+    starts, ends = starts[keep], ends[keep]
+    durations = np.maximum((timestamps[ends] - timestamps[starts]).astype(np.float64) / NS_PER_SECOND, 1e-9)
+    rates = (ends - starts) / durations
+    stats.bursts = [(int(s), int(e), float(r)) for s, e, r in zip(starts, ends, rates)]
+    return stats
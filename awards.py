@@ -0,0 +1,102 @@
+"""
+Table-driven awards for the CPS test.
+
+The award tiers are loaded from the awards.json file instead of being hardcoded, so new tiers can be added without changing the code. Each
+tier has a minimum CPS and lasts until the next tier's minimum (so there aren't gaps, e.g. 6.5 CPS is a "Normal clicker"). The tier of a
+result is found with a bisect over the sorted thresholds, so evaluating a result costs the same no matter how many tiers there are. If
+awards.json can't be parsed, the built-in tiers are used instead.
+"""
+
+import bisect, json
+from dataclasses import dataclass
+
+
+#Built-in tiers (the ones of the default awards.json), as (minimum CPS, name, title) tuples
+BUILTIN_TIERS = [
+    (5, "Normal clicker (get 5-6 CPS in a test)", "Gained new award!"),
+    (7, "Fast clicker (get 7-9 CPS in a test)", "Gained new award!"),
+    (10, "Jitter clicker (get 10-12 CPS in a test)", "Gained new award!"),
+    (13, "Butterfly clicker (get 13-16 CPS in a test)", "Gained new award!"),
+    (17, "True butterfly clicker (get 17-22 CPS in a test)", "Gained new award!"),
+    (23, "Drag clicker (get 23-30 CPS in a test)", "Gained new award!"),
+    (31, "Bolt clicker (get 31-40 CPS in a test)", "Gained new award!"),
+    (41, "Autoclicker clicker (get 41+ CPS in a test)", "Congratulations, you cheater!"),
+]
+
+
+@dataclass(frozen=True)
+class Award:
+    tier: int
+    min_cps: float
+    name: str
+    title: str = "Gained new award!"
+    message: str = ""
+
+
+class AwardRegistry:
+    def __init__(self, awards=()):
+        #Keep the awards sorted by their minimum CPS, with the thresholds in a separate list for bisect
+        self.awards = sorted(awards, key=lambda award: award.min_cps)
+        self.thresholds = [award.min_cps for award in self.awards]
+        self.tiers = {award.name: award.tier for award in self.awards}
+
+        #Why the tiers file couldn't be loaded (None if it was), so the app can tell the user
+        self.error = None
+
+    @classmethod
+    def builtin(cls):
+        """Return a registry with the built-in tiers."""
+        return cls(Award(tier=index, min_cps=min_cps, name=name, title=title, message=f"You gained the \"{name}\" award!")
+                   for index, (min_cps, name, title) in enumerate(BUILTIN_TIERS, start=1))
+
+    @classmethod
+    def load(cls, path="awards.json"):
+        """Load the award tiers from a JSON file. If the file doesn't exist, there won't be any awards. If it's invalid (not JSON or a
+        tier without a name or minimum CPS), the built-in tiers are used and the reason is kept in the error attribute."""
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError) as e:
+            return cls.invalid(path, e)
+
+        awards = []
+        try:
+            for tier in data.get("tiers", []):
+                name = str(tier["name"])
+                awards.append(Award(tier=int(tier.get("tier", len(awards) + 1)),
+                                    min_cps=float(tier["min_cps"]),
+                                    name=name,
+                                    title=str(tier.get("title", "Gained new award!")),
+                                    message=str(tier.get("message", f"You gained the \"{name}\" award!"))))
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            return cls.invalid(path, e)
+        return cls(awards)
+
+    @classmethod
+    def invalid(cls, path, error):
+        """Return the built-in tiers, with the reason the tiers file couldn't be loaded."""
+        registry = cls.builtin()
+        if isinstance(error, KeyError):
+            error = f"a tier has no {error} field"
+        registry.error = f"Can't load the award tiers from {path}, using the built-in tiers.\nError: {error}"
+        return registry
+
+    def award_for(self, cps):
+        """Return the award of the tier the CPS falls into, or None if it's below the first tier."""
+        index = bisect.bisect_right(self.thresholds, cps) - 1
+        if index < 0:
+            return None
+        return self.awards[index]
+
+    def evaluate(self, cps, earned):
+        """Return the award for the CPS if it isn't in the earned set yet, else None."""
+        award = self.award_for(cps)
+        if award is None or award.name in earned:
+            return None
+        return award
+
+    def ordered(self, earned):
+        """Return the earned award names as a list, sorted by tier (unknown awards go last)."""
+        return sorted(earned, key=lambda name: (self.tiers.get(name, float("inf")), name))
@@ -0,0 +1,123 @@
+"""
+Batch analysis of recorded sessions, without tkinter.
+
+Takes a folder with recorded sessions (.cpsx folders exported from the app and history .db files, searched recursively) and runs the same
+CPS, award and click statistics calculations as the end of a test in the app on every session. The files are spread over a process pool,
+and the results are printed as one table that grows as each file finishes. Every worker handles one file at a time, reading the clicks of
+.cpsx files through memory mapping and the rows of .db files one by one, so the peak memory doesn't grow with the number of files.
+
+Usage:
+    python batch.py recordings/
+    python batch.py recordings/ --workers 8 --csv > results.csv
+"""
+
+import argparse, csv, multiprocessing, os, sys
+
+#Columns of the output table
+COLUMNS = ("file", "session", "duration", "clicks", "cps", "award", "peak_cps", "jitter_ms", "p50_ms", "p99_ms", "bursts")
+
+#Award tiers of the worker process (loaded once by init_worker())
+award_registry = None
+
+
+def find_recordings(folder):
+    """Yield the .cpsx folders and .db files inside the folder (recursively), sorted by path."""
+    found = []
+    for root, folders, files in os.walk(folder):
+        for name in folders:
+            if name.endswith(".cpsx"):
+                found.append(os.path.join(root, name))
+        folders[:] = [name for name in folders if not name.endswith(".cpsx")]
+        found.extend(os.path.join(root, name) for name in files if name.endswith(".db"))
+    return sorted(found)
+
+
+def init_worker(awards_path):
+    """Load the award tiers in the worker process."""
+    global award_registry
+    from awards import AwardRegistry
+    award_registry = AwardRegistry.load(awards_path)
+
+
+def analyze_session(path, session_id, duration, click_count, clicks):
+    """Return the output row of a session: CPS and award like at the end of a test in the app, and the click statistics."""
+    from analysis import analyze_clicks
+    cps = click_count / duration if duration else 0.0
+    award = award_registry.award_for(cps)
+    stats = analyze_clicks(clicks)
+    return (path, session_id, duration, click_count, round(cps, 3), award.name if award else "",
+            round(stats.peak_cps, 3), round(stats.jitter * 1000, 3), round(stats.p50 * 1000, 3), round(stats.p99 * 1000, 3),
+            len(stats.bursts))
+
+
+def analyze_file(path):
+    """Analyze every session of a recording. Returns (path, rows, error). The rows are None (and the error is the reason) if the file
+    isn't a recording."""
+    rows = []
+    try:
+        if path.endswith(".cpsx"):
+            from export import SessionArchive
+            for session, clicks in SessionArchive(path):
+                rows.append(analyze_session(path, int(session["id"]), float(session["duration"]), int(session["click_count"]), clicks))
+        else:
+            from history import SessionHistory
+            try:
+                history = SessionHistory(path, read_only=True)
+            except ValueError as e:
+                #Other SQLite databases (e.g. profiles.db) aren't recordings
+                return path, None, str(e)
+            try:
+                for session, clicks in history.iterate():
+                    rows.append(analyze_session(path, session.id, session.duration, session.click_count, clicks))
+            finally:
+                history.close()
+    except Exception as e:
+        return path, rows, f"{type(e).__name__}: {e}"
+    return path, rows, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze recorded CPS test sessions in parallel.")
+    parser.add_argument("folder", help="folder with .cpsx exports and history .db files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes (default: one per core)")
+    parser.add_argument("--awards", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "awards.json"),
+                        help="award tiers file (default: awards.json)")
+    parser.add_argument("--csv", action="store_true", help="print CSV instead of an aligned table")
+    arguments = parser.parse_args()
+
+    from awards import AwardRegistry
+    error = AwardRegistry.load(arguments.awards).error
+    if error:
+        print(error, file=sys.stderr)
+
+    recordings = find_recordings(arguments.folder)
+    if not recordings:
+        parser.error(f"no .cpsx or .db recordings found in {arguments.folder}")
+
+    if arguments.csv:
+        writer = csv.writer(sys.stdout)
+        write_row = writer.writerow
+    else:
+        def write_row(row):
+            print("{:<40} {:>8} {:>9} {:>7} {:>9} {:<50} {:>9} {:>10} {:>8} {:>8} {:>6}".format(*row))
+    write_row(COLUMNS)
+
+    sessions = errors = skipped = 0
+    with multiprocessing.Pool(arguments.workers, initializer=init_worker, initargs=(arguments.awards,)) as pool:
+        for path, rows, error in pool.imap_unordered(analyze_file, recordings):
+            if rows is None:
+                skipped += 1
+                print(f"Skipped {path}: {error}", file=sys.stderr)
+                continue
+            for row in rows:
+                write_row((os.path.relpath(row[0], arguments.folder),) + row[1:])
+            sys.stdout.flush()
+            sessions += len(rows)
+            if error:
+                errors += 1
+                print(f"Error in {path}: {error}", file=sys.stderr)
+    print(f"{sessions} sessions in {len(recordings) - skipped} files ({errors} errors, {skipped} skipped)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Benchmark of the session history store: appends synthetic sessions to a temporary database and times the indexed queries.
+
+Run it from the repository folder: python benchmarks/bench_history.py [sessions]
+"""
+
+import os, random, sys, tempfile, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history import SessionHistory
+
+
+def timed(name, function, repeats=100):
+    """Call function() repeats times and print the mean time per call."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    print(f"{name:<28} {(time.perf_counter() - start) / repeats * 1000:8.3f} ms")
+    return result
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as folder:
+        history = SessionHistory(os.path.join(folder, "history.db"))
+
+        #Bulk load the sessions in a single transaction, then time a few appends like the app does
+        rows = []
+        for i in range(sessions):
+            duration = random.choice((1, 5, 10, 30, 60))
+            cps = random.uniform(3, 20)
+            rows.append((1_600_000_000 + i, duration, int(cps * duration), cps, None))
+        with history.connection:
+            history.connection.executemany(
+                "INSERT INTO sessions (finished_at, duration, click_count, cps, clicks) VALUES (?, ?, ?, ?, ?)", rows)
+        print(f"{len(history)} sessions")
+
+        timed("Record one session", lambda: history.record(10, 100, 10.0), repeats=200)
+        timed("Last 10 sessions", lambda: history.last(10))
+        timed("Best CPS for 10 s tests", lambda: history.best(10))
+        best = timed("Best CPS per duration", history.best_per_duration, repeats=20)
+        print("Best per duration:", {duration: round(cps, 2) for duration, cps in sorted(best.items())})
+        history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Load test of the leaderboard server: starts it in a separate process on a free localhost port, connects many simulated stations at once
+(each one with a persistent connection sending batches of results) and reports the requests per second, results per second and the
+request latency percentiles.
+
+Run it from the repository folder: python benchmarks/bench_leaderboard.py [stations] [batches per station] [results per batch]
+"""
+
+import asyncio, json, os, random, subprocess, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def station(port, number, batches, batch_size, latencies):
+    """A station sending its batches one after the other over a single connection, recording the latency of every request."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    rng = random.Random(number)
+    for _ in range(batches):
+        batch = [{"station": f"station-{number}", "duration": rng.choice((1, 5, 10, 30, 60)), "cps": rng.uniform(3, 20),
+                  "finished_at": time.time()} for _ in range(batch_size)]
+        start = time.perf_counter()
+        writer.write(json.dumps({"results": batch}).encode() + b"\n")
+        await writer.drain()
+        answer = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - start)
+        assert answer["ok"] and answer["accepted"] == batch_size, answer
+    writer.close()
+    await writer.wait_closed()
+
+
+async def load_test(port, stations, batches, batch_size):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(station(port, number, batches, batch_size, latencies) for number in range(stations)))
+    return time.perf_counter() - start, latencies
+
+
+def main():
+    stations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    batches = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, "leaderboard.py"), "--port", "0"],
+                              stdout=subprocess.PIPE, text=True)
+    try:
+        port = int(server.stdout.readline().rsplit(":", 1)[1])
+        elapsed, latencies = asyncio.run(load_test(port, stations, batches, batch_size))
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    requests = len(latencies)
+    print(f"{stations} stations x {batches} batches x {batch_size} results in {elapsed:.2f} s")
+    print(f"Requests: {requests / elapsed:,.0f}/s, results: {requests * batch_size / elapsed:,.0f}/s")
+    print(f"Latency: p50 {latencies[requests // 2] * 1000:.2f} ms, p99 {latencies[int(requests * 0.99)] * 1000:.2f} ms, "
+          f"max {latencies[-1] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
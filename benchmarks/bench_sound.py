@@ -0,0 +1,64 @@
+"""
+Micro-benchmark comparing the per-click latency of the old click sound path (decoding the WAV file on every click) with the pooled
+sound engine (decoding it once and playing it from reserved channels).
+
+Run it from the repository folder: python benchmarks/bench_sound.py [clicks]
+If there isn't any audio device available, SDL's dummy audio driver is used.
+"""
+
+import os, sys, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+from sound import SoundEngine
+
+SOUND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "click.wav")
+
+
+def measure(play, clicks):
+    """Call play() the given number of times and return the per-click latencies in microseconds, sorted."""
+    latencies = []
+    for _ in range(clicks):
+        start = time.perf_counter_ns()
+        play()
+        latencies.append((time.perf_counter_ns() - start) / 1000)
+    latencies.sort()
+    return latencies
+
+
+def report(name, latencies):
+    """Print the mean, median and 99th percentile of the latencies."""
+    mean = sum(latencies) / len(latencies)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<28} mean {mean:9.1f} us   p50 {p50:9.1f} us   p99 {p99:9.1f} us")
+
+
+def main():
+    clicks = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    try:
+        pygame.mixer.init()
+    except pygame.error:
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+        pygame.mixer.init()
+
+    #Old path: decode the file on every click
+    old = measure(lambda: pygame.mixer.Sound(SOUND).play(), clicks)
+    pygame.mixer.stop()
+
+    #New path: decode once, play from the pool
+    engine = SoundEngine()
+    engine.load(SOUND)
+    engine.prepare()
+    new = measure(engine.play, clicks)
+    pygame.mixer.stop()
+
+    print(f"{clicks} clicks, sound: {SOUND}")
+    report("Decode on every click", old)
+    report("Pooled sound engine", new)
+    print(f"Speedup (mean): {(sum(old) / sum(new)):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
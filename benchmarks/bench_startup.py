@@ -0,0 +1,46 @@
+"""
+Cold-start benchmark: compares the import cost of the app before the engine/GUI split (pygame imported and fully initialised with
+pygame.init(), NumPy imported by the analytics) with the current main.py, which imports pygame and NumPy lazily. Each measurement runs in a
+new Python process, so nothing is cached between them. The window itself isn't created, so no display is needed.
+
+Run it from the repository folder: python benchmarks/bench_startup.py [runs]
+"""
+
+import os, subprocess, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#What importing main.py cost before the split, and what it costs now
+OLD_STARTUP = "import json, time, pygame, numpy, tkinter, tkinter.messagebox, tkinter.filedialog, tkinter.ttk; pygame.init()"
+NEW_STARTUP = "import main"
+HEADLESS_STARTUP = "import engine"
+
+
+def measure(code, runs):
+    """Run the code in new Python processes and return the median wall time in milliseconds."""
+    times = []
+    environment = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1", SDL_AUDIODRIVER="dummy", SDL_VIDEODRIVER="dummy")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=environment, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return times[len(times) // 2]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    baseline = measure("pass", runs)
+    old = measure(OLD_STARTUP, runs)
+    new = measure(NEW_STARTUP, runs)
+    headless = measure(HEADLESS_STARTUP, runs)
+
+    print(f"Median of {runs} runs (the interpreter start-up, {baseline:.1f} ms, is subtracted):")
+    print(f"{'Before (pygame.init() at import)':<36} {old - baseline:8.1f} ms")
+    print(f"{'Now (import main)':<36} {new - baseline:8.1f} ms")
+    print(f"{'Headless engine (import engine)':<36} {headless - baseline:8.1f} ms")
+    print(f"Improvement: {old - new:.1f} ms ({(old - baseline) / max(new - baseline, 0.1):.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
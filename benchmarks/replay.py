@@ -0,0 +1,284 @@
+"""
+Click-stream replay and load-test harness.
+
+Feeds generated or recorded click streams into the headless engine (CpsSession) in place of CPS_Test.click(), simulating the single Tk
+event thread: a click that arrives while the previous one is still being handled waits for it, and the end of the test is detected either by
+the event-driven deadline timer or (like the old update() loop) by polling every update_delay milliseconds. The timer is modelled like
+TestTimer on Tk: after() is armed with a whole number of milliseconds once the first click has been handled, its callbacks only run on the
+ticks of the OS timer (--timer-resolution) and a callback that runs before the deadline re-arms itself with after(1). For every stream and detection
+mode it reports the counted CPS against the true injected rate, the late and dropped clicks, the time per click spent in the handler and
+the end-of-test detection latency. Every stream is replayed with the button's command (clicks seen on release, lost if released outside
+the button) and with the raw input mode (clicks seen on press and timed with the event timestamp).
+
+Generated streams: steady (10 CPS), jitter (12 CPS), drag (30 CPS, in bursts) and autoclicker (100 to 1000 CPS).
+
+Run it from the repository folder, e.g.:
+    python benchmarks/replay.py
+    python benchmarks/replay.py --stream autoclicker --duration 5 --update-delays 1,10,50 --handler-cost 0.5
+    python benchmarks/replay.py --history history.db --session 12
+"""
+
+import argparse, os, random, sys, time
+from dataclasses import dataclass
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from awards import AwardRegistry
+from engine import CpsSession
+
+NS_PER_MS = 1_000_000
+NS_PER_SECOND = 1_000_000_000
+
+
+def steady_stream(duration, cps=10, rng=None):
+    """Clicks at exactly cps clicks per second."""
+    interval = NS_PER_SECOND / cps
+    return [round(i * interval) for i in range(int(duration * cps * 1.2))]
+
+
+def jitter_stream(duration, cps=12, rng=None):
+    """Jitter clicking: about cps clicks per second, with a 25% standard deviation in the intervals."""
+    rng = rng or random.Random(0)
+    timestamps, now = [], 0.0
+    while now < duration * 1.2 * NS_PER_SECOND:
+        timestamps.append(round(now))
+        now += max(1.0, rng.gauss(NS_PER_SECOND / cps, 0.25 * NS_PER_SECOND / cps))
+    return timestamps
+
+
+def drag_stream(duration, cps=30, rng=None):
+    """Drag clicking: bursts of 8 to 20 very fast clicks separated by short pauses, averaging about cps clicks per second."""
+    rng = rng or random.Random(0)
+    timestamps, now = [], 0.0
+    while now < duration * 1.2 * NS_PER_SECOND:
+        for _ in range(rng.randint(8, 20)):
+            timestamps.append(round(now))
+            now += max(1.0, rng.gauss(0.6 * NS_PER_SECOND / cps, 0.1 * NS_PER_SECOND / cps))
+        now += rng.uniform(0.5, 1.5) * 5 * NS_PER_SECOND / cps
+    return timestamps
+
+
+def autoclicker_stream(duration, cps=None, rng=None):
+    """Autoclicker: a fixed rate between 100 and 1000 clicks per second with a tiny jitter."""
+    rng = rng or random.Random(0)
+    cps = cps or rng.choice((100, 250, 500, 1000))
+    interval = NS_PER_SECOND / cps
+    return [round(i * interval + rng.uniform(0, interval * 0.02)) for i in range(int(duration * cps * 1.2))]
+
+
+STREAMS = {
+    "steady": steady_stream,
+    "jitter": jitter_stream,
+    "drag": drag_stream,
+    "autoclicker": autoclicker_stream,
+}
+
+#How long each button press is held (seconds) and the fraction of releases that happen outside the click button (the pointer moves while
+#drag clicking), used to model the button's command, which only runs when the button is released inside it. These are assumptions, not
+#measurements, so the clicks dropped in command mode follow directly from them (the fraction can be changed with --outside-rate)
+PRESS_MODEL = {
+    "steady": (0.040, 0.0),
+    "jitter": (0.030, 0.0),
+    "drag": (0.006, 0.05),
+    "autoclicker": (0.0003, 0.0),
+    "recorded": (0.0, 0.0),
+}
+
+
+@dataclass
+class ReplayReport:
+    stream: str
+    input_mode: str
+    mode: str
+    true_cps: float
+    counted_cps: float
+    late: int
+    dropped: int
+    extra: int
+    handler_mean_ns: float
+    handler_p99_ns: float
+    detection_latency_ms: float
+
+
+def replay(name, presses, duration, update_delay=None, handler_cost=0.0, input_mode="command", late_threshold=1.0, rng=None,
+           timer_resolution=1.0, outside_rate=None):
+    """Replay the click press times (nanoseconds, sorted) through a CpsSession and return a ReplayReport.
+
+    update_delay is the polling interval in milliseconds, or None to use the event-driven deadline timer. handler_cost is extra time (in
+    milliseconds) spent by each click handler, to model the GUI work (label redraw, sound) on top of the engine. timer_resolution is the
+    period of the OS timer in milliseconds (after() callbacks run on its ticks). outside_rate overrides the fraction of releases outside
+    the button of PRESS_MODEL. In the "command" input
+    mode a click is handled when the button is released (and lost if it's released outside the button) and timed when its handler runs; in
+    the "raw" input mode it's handled when the button is pressed and timed with the press event's timestamp.
+
+    Clicks handled more than late_threshold milliseconds after their event are late; clicks pressed before the true end of the test (the
+    first press plus the duration) that weren't counted are dropped, and clicks pressed after it that were counted are extra."""
+    rng = rng or random.Random(0)
+    session = CpsSession(AwardRegistry())
+    session.start(duration)
+    presses = [press - presses[0] for press in presses]
+    true_end = round(duration * NS_PER_SECOND)
+    hold, model_outside_rate = PRESS_MODEL.get(name, (0.0, 0.0))
+    if outside_rate is None:
+        outside_rate = model_outside_rate
+    hold = round(hold * NS_PER_SECOND) if input_mode == "command" else 0
+
+    busy_until = 0
+    deadline = armed_at = detected = None
+    resolution = max(1, round(timer_resolution * NS_PER_MS))
+    tick_phase = rng.uniform(0, update_delay * NS_PER_MS) if update_delay else 0
+    late = dropped = extra = 0
+    handler_times = []
+
+    def detection_time():
+        """When the end of the test is detected, given the deadline and the handler busy until busy_until."""
+        if update_delay is None:
+            #TestTimer.start(): after() with the remaining time rounded to whole milliseconds, then _fire_deadline() re-arms itself with
+            #after(1) while it runs before the deadline. Callbacks run on the next tick of the OS timer.
+            def tick(when):
+                return -(-when // resolution) * resolution
+            delay = max(0, round((deadline - armed_at) / NS_PER_MS))
+            candidate = tick(armed_at + delay * NS_PER_MS)
+            while candidate < deadline:
+                candidate = tick(candidate + NS_PER_MS)
+        else:
+            #First polling tick at or after the deadline
+            interval = update_delay * NS_PER_MS
+            ticks = -(-(deadline - tick_phase) // interval)
+            candidate = tick_phase + ticks * interval
+        return max(candidate, busy_until)
+
+    for press in presses:
+        #In command mode the click is only seen when the button is released inside it
+        arrival = press + hold
+        if input_mode == "command" and outside_rate and rng.random() < outside_rate:
+            if press < true_end:
+                dropped += 1
+            continue
+        start = max(arrival, busy_until)
+
+        #Detect the end of the test if it happened before this click was handled
+        if deadline is not None and detected is None and detection_time() <= start:
+            detected = detection_time()
+            result = session.finish(detected)
+        if detected is not None:
+            if press < true_end:
+                dropped += 1
+            continue
+
+        #Handle the click, measuring the time spent in the engine
+        timestamp = start if input_mode == "command" else press
+        counted = session.click_count
+        before = time.perf_counter_ns()
+        first = session.click(timestamp)
+        cost = time.perf_counter_ns() - before
+        handler_times.append(cost)
+        busy_until = start + cost + round(handler_cost * NS_PER_MS)
+
+        if first:
+            #The deadline timer is armed once the first click's handler has finished
+            deadline = timestamp + round(duration * NS_PER_SECOND)
+            armed_at = busy_until
+        if press >= true_end and session.click_count > counted:
+            extra += 1
+        if start - arrival > late_threshold * NS_PER_MS:
+            late += 1
+
+    if detected is None:
+        detected = detection_time()
+        result = session.finish(detected)
+
+    handler_times.sort()
+    true_clicks = sum(1 for press in presses if press < true_end)
+    return ReplayReport(stream=name,
+                        input_mode=input_mode,
+                        mode="timer" if update_delay is None else f"poll {update_delay} ms",
+                        true_cps=true_clicks / duration,
+                        counted_cps=result.cps,
+                        late=late,
+                        dropped=dropped,
+                        extra=extra,
+                        handler_mean_ns=sum(handler_times) / len(handler_times),
+                        handler_p99_ns=handler_times[min(len(handler_times) - 1, int(len(handler_times) * 0.99))],
+                        detection_latency_ms=(detected - deadline) / NS_PER_MS)
+
+
+def load_recorded(arguments):
+    """Load a recorded click stream from the history database or from a text file with a timestamp (in nanoseconds) per line."""
+    if arguments.file:
+        with open(arguments.file, "r") as file:
+            return [int(line) for line in file if line.strip()]
+    from history import SessionHistory
+    history = SessionHistory(arguments.history)
+    try:
+        return list(history.clicks(arguments.session))
+    finally:
+        history.close()
+
+
+def print_reports(reports):
+    """Print the reports as a table."""
+    print(f"{'Stream':<14}{'Input':<9}{'Mode':<14}{'True CPS':>10}{'Counted':>10}{'Error':>9}{'Late':>7}{'Dropped':>9}{'Extra':>7}"
+          f"{'Handler mean':>15}{'Handler p99':>14}{'End latency':>14}")
+    for report in reports:
+        error = (report.counted_cps - report.true_cps) / report.true_cps * 100 if report.true_cps else 0.0
+        print(f"{report.stream:<14}{report.input_mode:<9}{report.mode:<14}{report.true_cps:>10.2f}{report.counted_cps:>10.2f}{error:>8.2f}%"
+              f"{report.late:>7}{report.dropped:>9}{report.extra:>7}{report.handler_mean_ns / 1000:>12.2f} us"
+              f"{report.handler_p99_ns / 1000:>11.2f} us{report.detection_latency_ms:>11.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay click streams through the CPS test engine and report its accuracy.")
+    parser.add_argument("--stream", choices=sorted(STREAMS), action="append",
+                        help="generated stream to replay (can be repeated, all of them by default)")
+    parser.add_argument("--file", help="text file with a recorded click timestamp (nanoseconds) per line")
+    parser.add_argument("--history", help="history database to load a recorded session from")
+    parser.add_argument("--session", type=int, help="id of the session to load from the history database")
+    parser.add_argument("--duration", type=float, default=10, help="test duration in seconds (default: 10)")
+    parser.add_argument("--update-delays", default="1,5,10,16,50",
+                        help="comma separated polling delays in milliseconds to compare with the timer (default: 1,5,10,16,50)")
+    parser.add_argument("--handler-cost", type=float, default=0.0,
+                        help="extra milliseconds spent by each click handler, to model the GUI work (default: 0)")
+    parser.add_argument("--inputs", default="command,raw",
+                        help="comma separated input modes to compare: command (button released) and raw (button pressed) "
+                             "(default: command,raw)")
+    parser.add_argument("--outside-rate", type=float,
+                        help="fraction of button releases outside the button in command mode, for every stream (default: the assumed "
+                             "PRESS_MODEL rates, 5%% for drag and 0 for the others)")
+    parser.add_argument("--timer-resolution", type=float, default=1.0,
+                        help="period of the OS timer in milliseconds, e.g. 15.6 for the default Windows timer (default: 1)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    arguments = parser.parse_args()
+    if arguments.history and arguments.session is None:
+        parser.error("--history needs --session")
+    if arguments.outside_rate is not None and not 0 <= arguments.outside_rate <= 1:
+        parser.error("--outside-rate must be between 0 and 1")
+
+    streams = {}
+    if arguments.file or arguments.history:
+        streams["recorded"] = load_recorded(arguments)
+    for name in arguments.stream or ([] if streams else sorted(STREAMS)):
+        streams[name] = STREAMS[name](arguments.duration, rng=random.Random(arguments.seed))
+
+    update_delays = [None] + [int(delay) for delay in arguments.update_delays.split(",") if delay]
+    reports = []
+    for name, arrivals in streams.items():
+        if len(arrivals) < 2:
+            print(f"Skipping {name}: it has less than 2 clicks")
+            continue
+        for input_mode in arguments.inputs.split(","):
+            for update_delay in update_delays:
+                reports.append(replay(name, arrivals, arguments.duration, update_delay, arguments.handler_cost, input_mode,
+                                      rng=random.Random(arguments.seed), timer_resolution=arguments.timer_resolution,
+                                      outside_rate=arguments.outside_rate))
+    print_reports(reports)
+    if "command" in arguments.inputs.split(","):
+        if arguments.outside_rate is None:
+            rates = ", ".join(f"{name} {PRESS_MODEL.get(name, (0.0, 0.0))[1]:.0%}" for name in streams)
+        else:
+            rates = f"{arguments.outside_rate:.0%} for every stream"
+        print(f"\nNote: the clicks dropped in command mode come from an assumed model, not a measurement: a fraction of the button "
+              f"releases ({rates}) is assumed to happen outside the button. Change it with --outside-rate.")
+
+
+if __name__ == "__main__":
+    main()
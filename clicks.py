@@ -0,0 +1,72 @@
+"""
+Compact storage for the click timestamps of a CPS test.
+
+Every click is stored as a time.perf_counter_ns() timestamp (monotonic and high resolution) in a preallocated array('Q') used as a ring
+buffer, so recording a click doesn't create a new Python object, even in 60 seconds or infinite (duration 0) tests. If the test is longer
+than the capacity, only the most recent clicks are kept.
+"""
+
+from array import array
+
+#Enough for a 60 seconds test at more than 1000 CPS (512 KiB)
+DEFAULT_CAPACITY = 1 << 16
+
+
+class ClickBuffer:
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.buffer = array("Q", bytes(8 * capacity))
+
+        #Total number of clicks recorded (may be bigger than the capacity) and index where the next one will be written
+        self.total = 0
+        self.position = 0
+
+    def __len__(self):
+        """Number of timestamps currently kept in the buffer."""
+        return min(self.total, self.capacity)
+
+    def append(self, timestamp):
+        """Record a click timestamp (in perf_counter nanoseconds)."""
+        self.buffer[self.position] = timestamp
+        self.position += 1
+        if self.position == self.capacity:
+            self.position = 0
+        self.total += 1
+
+    def clear(self):
+        """Forget all the clicks. The memory is kept for the next test."""
+        self.total = 0
+        self.position = 0
+
+    def first(self):
+        """Oldest kept timestamp, or None if the buffer is empty."""
+        if not self.total:
+            return None
+        return self.buffer[0] if self.total <= self.capacity else self.buffer[self.position]
+
+    def last(self):
+        """Newest timestamp, or None if the buffer is empty."""
+        if not self.total:
+            return None
+        return self.buffer[self.position - 1]
+
+    def timestamps(self):
+        """Return the kept timestamps as a new array('Q'), from the oldest to the newest."""
+        if self.total <= self.capacity:
+            return self.buffer[:self.total]
+        return self.buffer[self.position:] + self.buffer[:self.position]
+
+    def count_since(self, timestamp):
+        """Number of kept clicks made at or after the given timestamp. Only the clicks inside the window are visited."""
+        count = 0
+        index = self.position
+        for _ in range(len(self)):
+            index -= 1
+            if self.buffer[index] < timestamp:
+                break
+            count += 1
+        return count
+
+    def rolling_cps(self, now, window=1_000_000_000):
+        """CPS over the last window nanoseconds (1 second by default) ending at now."""
+        return self.count_since(now - window) * 1_000_000_000 / window
@@ -0,0 +1,81 @@
+"""
+Streaming autoclicker detector for the CPS test.
+
+Instead of a CPS threshold checked after the test, the detector updates online statistics of the click intervals on every click: the mean
+and variance (Welford's algorithm), a histogram of the intervals on a logarithmic scale (each bin is about 2% wider than the previous one, so
+the entropy doesn't depend on the clicking speed) and the entropy of that histogram (kept up to date incrementally). Human clicking is irregular, while autoclickers click at an almost constant pace, so a very low coefficient of variation or
+a very low entropy is flagged as soon as enough clicks have been seen. Every click costs the same and no memory is allocated, so it can run
+inside the click handler at 1000+ CPS.
+"""
+
+import math
+from array import array
+
+#Histogram bins per doubling of the interval, the interval of the first bin (2^17 ns, about 0.13 ms) and number of bins (up to 2^33 ns,
+#about 8.6 s; shorter and longer intervals go to the first and the last bin)
+BINS_PER_OCTAVE = 32
+FIRST_OCTAVE = 17
+BINS = 16 * BINS_PER_OCTAVE
+
+
+class StreamingDetector:
+    def __init__(self, min_intervals=20, max_variation=0.05, min_entropy=1.5):
+        #Intervals needed before flagging, maximum coefficient of variation and minimum entropy (in bits) considered human
+        self.min_intervals = min_intervals
+        self.max_variation = max_variation
+        self.min_entropy = min_entropy
+        self.histogram = array("Q", bytes(8 * BINS))
+        self.reset()
+
+    def reset(self):
+        """Forget all the clicks."""
+        self.last = None
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        for index in range(BINS):
+            self.histogram[index] = 0
+
+        #Sum of c * log(c) over the histogram bins, used to update the entropy in O(1)
+        self.count_log_count = 0.0
+        self.flagged = None
+
+    def add(self, timestamp):
+        """Add a click (perf_counter_ns timestamp). Returns True if this click made the detector flag the test."""
+        last, self.last = self.last, timestamp
+        if last is None:
+            return False
+        #An earlier timestamp than the last one counts as a 0 ns interval instead of a negative one
+        interval = max(timestamp - last, 0)
+
+        #Welford's online mean and variance
+        self.count += 1
+        delta = interval - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (interval - self.mean)
+
+        #Histogram and entropy: only the term of the bin that changed is updated
+        index = min(max(int((math.log2(interval) - FIRST_OCTAVE) * BINS_PER_OCTAVE), 0), BINS - 1) if interval else 0
+        bin_count = self.histogram[index]
+        self.histogram[index] = bin_count + 1
+        self.count_log_count += (bin_count + 1) * math.log(bin_count + 1) - (bin_count * math.log(bin_count) if bin_count else 0.0)
+
+        if self.flagged is None and self.count >= self.min_intervals:
+            if self.variation() < self.max_variation:
+                self.flagged = "intervals too regular (variation {:.1%})".format(self.variation())
+            elif self.entropy() < self.min_entropy:
+                self.flagged = "intervals too predictable ({:.2f} bits of entropy)".format(self.entropy())
+            return self.flagged is not None
+        return False
+
+    def variation(self):
+        """Coefficient of variation of the intervals (standard deviation divided by the mean)."""
+        if self.count < 2 or self.mean <= 0:
+            return 0.0
+        return math.sqrt(self.m2 / (self.count - 1)) / self.mean
+
+    def entropy(self):
+        """Shannon entropy of the interval histogram, in bits."""
+        if not self.count:
+            return 0.0
+        return (math.log(self.count) - self.count_log_count / self.count) / math.log(2)
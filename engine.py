@@ -0,0 +1,137 @@
+"""
+Headless engine of the CPS test.
+
+The CpsSession class holds all the state and scoring logic of a test (clicks, CPS, awards and highest score) without depending on tkinter
+or pygame, so it can be used, tested and benchmarked without a display. It takes perf_counter_ns timestamps and returns the results; the
+tkinter front end (main.py) only forwards the clicks and shows the results. NumPy (used by the analytics) is imported only when a test is
+finished.
+"""
+
+import time
+from dataclasses import dataclass
+
+from clicks import ClickBuffer, DEFAULT_CAPACITY
+from detector import StreamingDetector
+
+
+@dataclass
+class TestResult:
+    duration: float
+    click_count: int
+    cps: float
+    #ClickStats of the test (see analysis.py)
+    stats: object = None
+    #New award earned with the test (or None) and the highest score before the test
+    award: object = None
+    previous_highest_score: float = 0
+    new_highest_score: bool = False
+    #Number of clicks made with each input ("left", "right" and "key")
+    inputs: dict = None
+    #Why the streaming detector flagged the clicks as machine-like (None if it didn't)
+    suspicious: str = None
+
+
+class CpsSession:
+    def __init__(self, award_registry, awards=(), highest_score=0, capacity=DEFAULT_CAPACITY):
+        #Award tiers, earned awards and highest score
+        self.award_registry = award_registry
+        self.awards = set(awards)
+        self.highest_score = highest_score
+
+        #Info for the current test (the times are time.perf_counter_ns() timestamps)
+        self.duration = 0
+        self.click_count = 0
+        self.start_time = None
+        self.end_time = None
+        self.clicks = ClickBuffer(capacity)
+        self.inputs = {"left": 0, "right": 0, "key": 0}
+
+        #Streaming autoclicker detector, updated on every click
+        self.detector = StreamingDetector()
+
+    @property
+    def running(self):
+        """Whether the first click has been made and the test hasn't ended yet."""
+        return self.start_time is not None and self.end_time is None
+
+    def start(self, duration):
+        """Prepare a new test of the given duration in seconds (0 means infinite). The test starts with the first click."""
+        if duration < 0:
+            raise ValueError("The duration must be a positive number")
+        self.reset()
+        self.duration = duration
+
+    def reset(self):
+        """Forget the current test."""
+        self.click_count = 0
+        self.start_time = None
+        self.end_time = None
+        self.clicks.clear()
+        for source in self.inputs:
+            self.inputs[source] = 0
+        self.detector.reset()
+
+    def click(self, timestamp=None, source="left"):
+        """Record a click made with the given input ("left", "right" or "key"). Returns True if it's the first click of the test (the
+        one that starts it), False if it's another counted click and None if it isn't counted (the test has ended)."""
+        if timestamp is None:
+            timestamp = time.perf_counter_ns()
+        if self.end_time is not None:
+            return None
+
+        #A click made at or after the deadline doesn't count, even if it's handled before the deadline callback runs
+        if self.start_time is not None and self.duration > 0 and timestamp - self.start_time >= self.duration * 1e9:
+            return None
+
+        #Timestamps must not go backwards (the intervals would be negative), so an earlier one is counted at the time of the last click
+        if self.click_count and timestamp < self.clicks.last():
+            timestamp = self.clicks.last()
+        self.clicks.append(timestamp)
+        self.click_count += 1
+        self.inputs[source] += 1
+        self.detector.add(timestamp)
+        if self.start_time is None:
+            self.start_time = timestamp
+            return True
+        return False
+
+    def elapsed(self, now=None):
+        """Seconds elapsed since the first click (until the end of the test if it has ended)."""
+        if self.start_time is None:
+            return 0.0
+        if now is None:
+            now = self.end_time if self.end_time is not None else time.perf_counter_ns()
+        return (now - self.start_time) / 1e9
+
+    def finish(self, timestamp=None):
+        """End the test at its deadline and return its TestResult: CPS, click statistics, new award and highest score."""
+        from analysis import analyze_clicks
+
+        self.end_time = time.perf_counter_ns() if timestamp is None else timestamp
+
+        #Calculate the CPS and analyze the click intervals (jitter, peak CPS, bursts)
+        cps = self.click_count / self.duration
+        result = TestResult(duration=self.duration, click_count=self.click_count, cps=cps,
+                            stats=analyze_clicks(self.clicks.timestamps()),
+                            previous_highest_score=self.highest_score, inputs=dict(self.inputs),
+                            suspicious=self.detector.flagged)
+
+        #Give the user a new award if he got one
+        result.award = self.award_registry.evaluate(cps, self.awards)
+        if result.award:
+            self.awards.add(result.award.name)
+
+        #Check if the user has beaten his highest score
+        if cps > self.highest_score:
+            self.highest_score = cps
+            result.new_highest_score = True
+        return result
+
+    def abort(self, timestamp=None):
+        """End the test without results."""
+        self.end_time = time.perf_counter_ns() if timestamp is None else timestamp
+
+    def reset_awards(self):
+        """Forget all the earned awards and the highest score."""
+        self.awards = set()
+        self.highest_score = 0
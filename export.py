@@ -0,0 +1,79 @@
+"""
+Columnar export and import of recorded sessions.
+
+The sessions of the history are exported to a ".cpsx" folder with two NumPy files:
+
+- sessions.npy: the index, a structured array with one row per session (id, finished_at, duration, click_count, cps, and the offset and
+  length of its clicks).
+- clicks.npy: the click timestamps (perf_counter_ns, uint64) of every session, one after the other.
+
+SessionArchive opens them with memory mapping, so millions of clicks from many stations can be loaded without reading them into memory or
+copying them into Python lists: the clicks of a session are a view into the mapped file.
+"""
+
+import os
+
+import numpy as np
+
+INDEX_DTYPE = np.dtype([
+    ("id", "<i8"),
+    ("finished_at", "<f8"),
+    ("duration", "<f8"),
+    ("click_count", "<i8"),
+    ("cps", "<f8"),
+    ("offset", "<i8"),
+    ("length", "<i8"),
+])
+
+
+def export_sessions(history, path):
+    """Export every session of the history (a SessionHistory) to the .cpsx folder at the path. The clicks are written straight into a
+    memory-mapped file, one session at a time. Returns the number of exported sessions."""
+    os.makedirs(path, exist_ok=True)
+    sessions = len(history)
+    index = np.lib.format.open_memmap(os.path.join(path, "sessions.npy"), mode="w+", dtype=INDEX_DTYPE, shape=(sessions,))
+    clicks = np.lib.format.open_memmap(os.path.join(path, "clicks.npy"), mode="w+", dtype="<u8",
+                                       shape=(history.stored_clicks(),))
+
+    offset = 0
+    row = -1
+    for row, (session, timestamps) in enumerate(history.iterate()):
+        if row >= sessions:
+            break
+        length = len(timestamps)
+        clicks[offset:offset + length] = np.frombuffer(timestamps, dtype=np.uint64)
+        index[row] = (session.id, session.finished_at, session.duration, session.click_count, session.cps, offset, length)
+        offset += length
+    index.flush()
+    clicks.flush()
+    return row + 1
+
+
+class SessionArchive:
+    def __init__(self, path):
+        #Memory-mapped index and clicks (nothing is read until it's used)
+        self.path = path
+        self.index = np.load(os.path.join(path, "sessions.npy"), mmap_mode="r")
+        self.all_clicks = np.load(os.path.join(path, "clicks.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.index)
+
+    def clicks(self, row):
+        """Return the click timestamps of the session in the given row, as a view into the mapped file."""
+        offset, length = int(self.index["offset"][row]), int(self.index["length"][row])
+        return self.all_clicks[offset:offset + length]
+
+    def __iter__(self):
+        """Yield every (index row, clicks) pair."""
+        for row in range(len(self.index)):
+            yield self.index[row], self.clicks(row)
+
+
+def import_sessions(history, path):
+    """Append the sessions of the .cpsx folder at the path to the history. Returns the number of imported sessions."""
+    archive = SessionArchive(path)
+    history.record_many((float(session["finished_at"]), float(session["duration"]), int(session["click_count"]),
+                         float(session["cps"]), clicks if len(clicks) else None)
+                        for session, clicks in archive)
+    return len(archive)
@@ -0,0 +1,83 @@
+"""
+Live CPS-over-time graph for the CPS test.
+
+The graph is drawn on a Tk Canvas with a fixed set of items (a line, its axis and two labels) that are created once and then only moved with
+coords() and itemconfig(); nothing is deleted and redrawn. It keeps a fixed number of samples of the rolling CPS in a ring, so every frame
+costs the same even in 10 minute or infinite tests, and it only samples when its interval has elapsed, so calling refresh() from the redraw
+pass never delays the handling of the next click.
+"""
+
+from array import array
+
+NS_PER_SECOND = 1_000_000_000
+
+
+class LiveGraph:
+    def __init__(self, canvas, points=120, sample_interval=0.25, window=1.0, color="grey20"):
+        #The canvas, number of samples shown, seconds between samples and seconds of clicks averaged by each sample
+        self.canvas = canvas
+        self.points = points
+        self.sample_interval = round(sample_interval * NS_PER_SECOND)
+        self.window = round(window * NS_PER_SECOND)
+
+        #Ring of the last samples (in CPS)
+        self.samples = array("d", bytes(8 * points))
+        self.position = 0
+        self.total = 0
+        self.next_sample = None
+
+        #Create the fixed set of canvas items
+        self.width = int(canvas["width"])
+        self.height = int(canvas["height"])
+        self.margin = 30
+        self.axis = canvas.create_line(self.margin, self.height - 15, self.width, self.height - 15, fill="grey60")
+        self.line = canvas.create_line(0, 0, 0, 0, fill=color, width=2, state="hidden")
+        self.label_max = canvas.create_text(self.margin - 4, 8, anchor="e", text="", font=("Roboto", 8))
+        self.label_time = canvas.create_text(self.width, self.height - 2, anchor="se", text="", font=("Roboto", 8))
+
+    def reset(self):
+        """Forget the samples and hide the line."""
+        self.samples = array("d", bytes(8 * self.points))
+        self.position = 0
+        self.total = 0
+        self.next_sample = None
+        self.canvas.itemconfig(self.line, state="hidden")
+        self.canvas.itemconfig(self.label_max, text="")
+        self.canvas.itemconfig(self.label_time, text="")
+
+    def refresh(self, now, clicks, start):
+        """Take a sample of the rolling CPS of the clicks (a ClickBuffer) if it's due and move the line. now and start are
+        perf_counter_ns timestamps."""
+        if self.next_sample is None:
+            self.next_sample = start + self.sample_interval
+        if now < self.next_sample:
+            return
+        self.next_sample += self.sample_interval * ((now - self.next_sample) // self.sample_interval + 1)
+
+        #Add the sample to the ring
+        self.samples[self.position] = clicks.rolling_cps(now, self.window)
+        self.position = (self.position + 1) % self.points
+        self.total += 1
+        self.draw((now - start) / NS_PER_SECOND)
+
+    def draw(self, elapsed):
+        """Move the line to the samples in the ring, scaled to the biggest one."""
+        count = min(self.total, self.points)
+        if count < 2:
+            return
+        first = (self.position - count) % self.points
+        top = max(max(self.samples), 1.0)
+
+        #Spread the samples over the whole width, from the oldest (left) to the newest (right)
+        step = (self.width - self.margin) / (self.points - 1)
+        bottom = self.height - 15
+        scale = (bottom - 8) / top
+        coordinates = []
+        for offset in range(count):
+            coordinates.append(self.margin + (self.points - count + offset) * step)
+            coordinates.append(bottom - self.samples[(first + offset) % self.points] * scale)
+
+        self.canvas.coords(self.line, coordinates)
+        self.canvas.itemconfig(self.line, state="normal")
+        self.canvas.itemconfig(self.label_max, text=f"{top:.0f}")
+        self.canvas.itemconfig(self.label_time, text=f"{elapsed:.1f} s")
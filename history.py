@@ -0,0 +1,153 @@
+"""
+Session history store for the CPS test.
+
+Every finished test is appended to an SQLite database (history.db) in WAL mode, so recording a test only appends to the write-ahead log
+instead of rewriting a whole file like config.json. Each session stores its duration, click count, CPS and (optionally) the raw click
+timestamps. The sessions are indexed by duration and CPS and by finish time, so queries like "best CPS per duration" or "last N sessions"
+stay fast with hundreds of thousands of sessions.
+"""
+
+import sqlite3, time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+
+
+def clicks_blob(clicks):
+    """Convert click timestamps (an array('Q'), a uint64 NumPy array or any sequence of integers) to the bytes stored in the database."""
+    if hasattr(clicks, "tobytes"):
+        return clicks.tobytes()
+    return array("Q", clicks).tobytes()
+
+
+@dataclass
+class Session:
+    id: int
+    finished_at: float
+    duration: float
+    click_count: int
+    cps: float
+
+
+class SessionHistory:
+    def __init__(self, path="history.db", read_only=False):
+        """Open (or create) the history at the path. A read-only history never changes the file (no journal mode or schema) and raises
+        ValueError if it has no sessions table. If there's a -wal file next to it (the app has it open, crashed or the file was copied
+        with it), it's read too, so sessions that weren't checkpointed yet are included; otherwise the file is opened as immutable, so no
+        -wal or -shm files are created."""
+        self.path = path
+        if read_only:
+            uri = Path(path).absolute().as_uri() + "?mode=ro"
+            if not Path(path + "-wal").exists():
+                uri += "&immutable=1"
+            self.connection = sqlite3.connect(uri, uri=True)
+            try:
+                row = self.connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sessions'").fetchone()
+            except sqlite3.DatabaseError:
+                self.connection.close()
+                raise
+            if row is None:
+                self.connection.close()
+                raise ValueError(f"{path} has no sessions table")
+            return
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute("""CREATE TABLE IF NOT EXISTS sessions (
+                                           id INTEGER PRIMARY KEY,
+                                           finished_at REAL NOT NULL,
+                                           duration REAL NOT NULL,
+                                           click_count INTEGER NOT NULL,
+                                           cps REAL NOT NULL,
+                                           clicks BLOB
+                                       )""")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS sessions_duration_cps ON sessions (duration, cps)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS sessions_finished_at ON sessions (finished_at)")
+
+    def record(self, duration, click_count, cps, clicks=None, finished_at=None):
+        """Append a finished test to the history and return its id. The clicks are perf_counter_ns timestamps (e.g. an array('Q'))."""
+        if finished_at is None:
+            finished_at = time.time()
+        if clicks is not None:
+            clicks = clicks_blob(clicks)
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO sessions (finished_at, duration, click_count, cps, clicks) VALUES (?, ?, ?, ?, ?)",
+                (finished_at, duration, click_count, cps, clicks))
+        return cursor.lastrowid
+
+    def record_many(self, sessions):
+        """Append many sessions in a single transaction. Each session is a (finished_at, duration, click_count, cps, clicks) tuple."""
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO sessions (finished_at, duration, click_count, cps, clicks) VALUES (?, ?, ?, ?, ?)",
+                ((finished_at, duration, click_count, cps, None if clicks is None else clicks_blob(clicks))
+                 for finished_at, duration, click_count, cps, clicks in sessions))
+
+    def iterate(self):
+        """Yield every session with its click timestamps (an array('Q')), from the oldest to the newest, reading one row at a time."""
+        rows = self.connection.execute(
+            "SELECT id, finished_at, duration, click_count, cps, clicks FROM sessions ORDER BY finished_at, id")
+        for *session, blob in rows:
+            timestamps = array("Q")
+            if blob:
+                timestamps.frombytes(blob)
+            yield Session(*session), timestamps
+
+    def sessions(self, after_id=0):
+        """Yield every session (or only the ones with an id greater than after_id) without its clicks, from the oldest to the newest,
+        reading one row at a time."""
+        rows = self.connection.execute(
+            "SELECT id, finished_at, duration, click_count, cps FROM sessions WHERE id > ? ORDER BY finished_at, id", (after_id,))
+        for row in rows:
+            yield Session(*row)
+
+    def stored_clicks(self):
+        """Total number of click timestamps stored in the history."""
+        return self.connection.execute("SELECT COALESCE(SUM(LENGTH(clicks)), 0) / 8 FROM sessions").fetchone()[0]
+
+    def last(self, count=10):
+        """Return the last sessions, from the newest to the oldest."""
+        rows = self.connection.execute(
+            "SELECT id, finished_at, duration, click_count, cps FROM sessions ORDER BY finished_at DESC LIMIT ?", (count,))
+        return [Session(*row) for row in rows]
+
+    def best(self, duration):
+        """Return the session with the best CPS for the given duration, or None if there isn't any."""
+        row = self.connection.execute(
+            "SELECT id, finished_at, duration, click_count, cps FROM sessions WHERE duration = ? ORDER BY cps DESC LIMIT 1",
+            (duration,)).fetchone()
+        return Session(*row) if row else None
+
+    def best_per_duration(self):
+        """Return a {duration: best CPS} dictionary. The distinct durations are found by skipping through the (duration, cps) index, so
+        this costs one index lookup per duration instead of a scan of every session."""
+        rows = self.connection.execute("""WITH RECURSIVE durations (duration) AS (
+                                              SELECT MIN(duration) FROM sessions
+                                              UNION ALL
+                                              SELECT (SELECT MIN(duration) FROM sessions WHERE duration > durations.duration)
+                                              FROM durations WHERE durations.duration IS NOT NULL
+                                          )
+                                          SELECT duration, (SELECT MAX(cps) FROM sessions WHERE sessions.duration = durations.duration)
+                                          FROM durations WHERE duration IS NOT NULL""")
+        return dict(rows)
+
+    def clicks(self, session_id):
+        """Return the click timestamps of a session as an array('Q') (empty if they weren't recorded)."""
+        row = self.connection.execute("SELECT clicks FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        timestamps = array("Q")
+        if row and row[0]:
+            timestamps.frombytes(row[0])
+        return timestamps
+
+    def last_id(self):
+        """Id of the newest recorded session (0 if there isn't any)."""
+        return self.connection.execute("SELECT COALESCE(MAX(id), 0) FROM sessions").fetchone()[0]
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self):
+        """Close the database."""
+        self.connection.close()
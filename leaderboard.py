@@ -0,0 +1,199 @@
+"""
+Local leaderboard for several CPS test stations.
+
+The server (run "python leaderboard.py") is an asyncio TCP service that keeps the top K results of each test duration in memory, in a
+min-heap per duration, so a new result costs O(log K) and hundreds of stations can send results concurrently. The protocol is one JSON
+object per line:
+
+    {"results": [{"station": "pc-1", "duration": 10, "cps": 12.3, "finished_at": 1700000000.0}, ...]}  ->  {"ok": true, "accepted": 1}
+    {"top": 10, "duration": 10}                                                                          ->  {"ok": true, "top": [...]}
+
+The client (LeaderboardClient) is used by the app: results are queued without blocking the GUI and sent in batches over a single
+persistent connection by a background thread, which reconnects if the connection is lost.
+"""
+
+import argparse, asyncio, heapq, itertools, json, queue, socket, threading, time
+
+
+class Leaderboard:
+    """Top K results of each duration bucket."""
+
+    def __init__(self, top_k=100):
+        self.top_k = top_k
+        #Min-heaps of (cps, sequence number, result) for each duration, the worst kept result at the top
+        self.buckets = {}
+        self.sequence = itertools.count()
+        self.received = 0
+
+    def add(self, result):
+        """Add a result (a dictionary with at least "duration" and "cps"). Returns False if it's invalid."""
+        try:
+            duration = float(result["duration"])
+            cps = float(result["cps"])
+        except (KeyError, TypeError, ValueError):
+            return False
+        self.received += 1
+        heap = self.buckets.setdefault(duration, [])
+        entry = (cps, next(self.sequence), result)
+        if len(heap) < self.top_k:
+            heapq.heappush(heap, entry)
+        elif cps > heap[0][0]:
+            heapq.heapreplace(heap, entry)
+        return True
+
+    def top(self, duration, count=10):
+        """Return the best results of a duration, from the best to the worst."""
+        heap = self.buckets.get(float(duration), [])
+        return [result for _, _, result in heapq.nlargest(count, heap)]
+
+
+class LeaderboardServer:
+    def __init__(self, host="127.0.0.1", port=8765, top_k=100):
+        self.host = host
+        self.port = port
+        self.leaderboard = Leaderboard(top_k)
+        self.server = None
+
+    async def start(self):
+        """Start listening. If the port is 0, a free port is chosen (see self.port)."""
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def handle_client(self, reader, writer):
+        """Answer the requests of a station until it disconnects."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write(json.dumps(self.handle_request(line)).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            #The station disconnected or sent a line longer than the stream limit
+            pass
+        finally:
+            writer.close()
+
+    def handle_request(self, line):
+        """Return the answer to a request line."""
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {"ok": False, "error": "invalid JSON"}
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "the request must be a JSON object"}
+        if "results" in request:
+            if not isinstance(request["results"], list):
+                return {"ok": False, "error": "the results must be a list"}
+            accepted = sum(self.leaderboard.add(result) for result in request["results"] if isinstance(result, dict))
+            return {"ok": True, "accepted": accepted}
+        if "top" in request:
+            try:
+                return {"ok": True, "top": self.leaderboard.top(request.get("duration", 10), int(request["top"]))}
+            except (TypeError, ValueError):
+                return {"ok": False, "error": "invalid top request"}
+        return {"ok": False, "error": "unknown request"}
+
+
+class LeaderboardClient:
+    def __init__(self, host, port, station=None, batch_size=20, flush_interval=1.0, max_pending=10000):
+        #Server address, name of this station and batching settings (the flush interval is in seconds)
+        self.address = (host, port)
+        self.station = station or socket.gethostname()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        #Results waiting to be sent and the background sending thread
+        self.pending = queue.Queue(max_pending)
+        self.connection = None
+        self.reader = None
+        self.stopping = False
+        self.thread = threading.Thread(target=self.run, name="leaderboard-client", daemon=True)
+        self.thread.start()
+
+    def submit(self, duration, cps, **extra):
+        """Queue a result to be sent. Never blocks: if too many results are pending (e.g. the server is down), the result is dropped."""
+        result = dict(extra, station=self.station, duration=duration, cps=cps, finished_at=time.time())
+        try:
+            self.pending.put_nowait(result)
+        except queue.Full:
+            pass
+
+    def next_batch(self):
+        """Wait for a result, then collect more until the batch is full or the flush interval has elapsed."""
+        batch = [self.pending.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and not self.stopping:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return [result for result in batch if result is not None]
+
+    def send(self, batch):
+        """Send a batch over the persistent connection and wait for the answer. Raises OSError if it fails."""
+        if self.connection is None:
+            self.connection = socket.create_connection(self.address, timeout=5)
+            self.reader = self.connection.makefile("rb")
+        self.connection.sendall(json.dumps({"results": batch}).encode() + b"\n")
+        if not self.reader.readline():
+            raise ConnectionError("The leaderboard server closed the connection")
+
+    def run(self):
+        """Background thread: send the results in batches, reconnecting (and retrying the batch) if the connection is lost."""
+        while True:
+            batch = self.next_batch()
+            while batch:
+                try:
+                    self.send(batch)
+                    break
+                except OSError:
+                    self.disconnect()
+                    if self.stopping:
+                        return
+                    time.sleep(self.flush_interval)
+            if self.stopping and self.pending.empty():
+                return
+
+    def disconnect(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def close(self, timeout=2.0):
+        """Send the pending results (waiting at most timeout seconds) and stop the background thread."""
+        self.stopping = True
+        try:
+            self.pending.put_nowait(None)
+        except queue.Full:
+            pass
+        self.thread.join(timeout)
+        self.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the CPS test leaderboard server.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on, 0 for any free port (default: 8765)")
+    parser.add_argument("--top", type=int, default=100, help="results kept for each duration (default: 100)")
+    arguments = parser.parse_args()
+
+    server = LeaderboardServer(arguments.host, arguments.port, arguments.top)
+
+    async def serve():
+        await server.start()
+        print(f"Listening on {server.host}:{server.port}", flush=True)
+        async with server.server:
+            await server.server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -18,7 +18,9 @@ To use the application:
 Repeat steps from 1 to 5 to run more tests
 
 
-The application provides different awards based on the CPS achieved (the awards are saved when the program is closed and load again when the program is opened):
+The application provides different awards based on the CPS achieved (the awards are saved when the program is closed and load again when the program is opened).
+The award tiers are read from the awards.json file, so you can add your own tiers there. Each tier lasts until the next one starts (e.g. 6.5 CPS
+is still a Normal clicker):
 
 - Normal clicker: 5-6 CPS
 - Fast clicker: 7-9 CPS
@@ -32,15 +34,32 @@ The application provides different awards based on the CPS achieved (the awards
 
 Notes: 
 
-- The application may display a slightly incorrect time when the test is finished (e.g., 5 seconds may be shown as 4.99).
+- In raw input mode (the "Raw input" checkbutton), clicks are counted when the mouse button is pressed instead of when it's released, right
+clicks count too and so do the keyboard keys in "input_keys" in config.json (Z and X by default). The left, right and key clicks are shown
+separately at the end of the test.
+
+- Several stations can share a leaderboard: run "python leaderboard.py" on one computer and set "leaderboard" to its address (e.g.
+"192.168.1.10:8765") and "station" to a name in the config.json file of every station. Every result is then sent to the leaderboard.
+
+- If you set "profiling" to true in config.json, a "Show profiler" button appears. It shows how long the clicks, timer updates, label redraws
+and click sounds take, and can export a Chrome trace of the recent events.
+
+- Several players can use the same computer with their own awards and scores: choose "Profile > Switch profile..." and enter a name (a
+new profile is created if it doesn't exist). The stats window shows where the best results of the profile rank among every profile.
+
+- The "Show stats" window shows your average CPS, your best and average CPS for each duration, the trend of your last tests and how many
+tests fell into each award tier. These statistics are updated at the end of each test and saved with your profile.
+
+- Every click is timed with a monotonic, high resolution clock (time.perf_counter_ns()), so the test always lasts the exact duration.
 
 - You can ignore zeros at the start of numbers, even on floats. For example: 01 -> 1; 0.1 -> .1
 
 - The duration must be in seconds, not minutes, not milliseconds, but seconds. The value must be an integer or a float. Use a point (.) and not a comma (,) as floating point.
 
-- If the duration is 0, the test will be infinite, giving no results. This is made on purpose. You will get ZeroDivisionError at line 104, but it won't crash the program.
+- If the duration is 0, the test will be infinite, giving no results. This is made on purpose. The test keeps running until you press "End test".
 
-- If the update delay value is zero or a negative number, the program will likely crash. This is not a bug, it's common sense.
+- The update delay is how often (in milliseconds) the timer is redrawn during a test. It doesn't affect when the test ends, because the end of
+the test is scheduled as a single deadline when the first click is made. It must be a positive integer.
 
 - Even if you use the clicking method of an achivement, you may get different CPS than what the achievement shows. For example even if you drag click you may not get 23-30 CPS.
 
@@ -53,13 +72,24 @@ I don't think I have to describe what each widget does, it pretty self-explainat
 Created by pancracium @ GitHub (https://github.com/pancracium/cps-test).
 """
 
-#Import the necessary modules and call pygame.init() to initilize pygame
-import json, pygame, time
+#Import the necessary modules (pygame, numpy and the leaderboard client are imported lazily, only when they're needed)
+import time
 import tkinter as tk
 import tkinter.messagebox as msgbox
-from tkinter import filedialog
+from tkinter import filedialog, simpledialog
 from tkinter import ttk
-pygame.init()
+from sound import SoundEngine, SoundError
+from timer import TestTimer
+from engine import CpsSession
+from awards import AwardRegistry
+from history import SessionHistory
+from storage import ConfigStore, config_value
+from profiling import Profiler
+from graph import LiveGraph
+from rawinput import RawInput
+from soundcache import SoundCache
+from stats import SessionStats, NO_TIER
+from profiles import ProfileStore, DEFAULT_PROFILE
 
 class CPS_Test:
     def __init__(self):
@@ -76,26 +106,78 @@ class CPS_Test:
         self.click_font = ("Roboto", 20, "bold")
         self.font = ("Roboto", 11, "bold")
 
-        #Info for the CPS test result
-        self.click_count = 0
-        self.start_time = None
-        self.end_time = None
+        #Delay between redraws of the timer label, in milliseconds, and the click count shown by the last redraw
         self.update_delay = 10
+        self.shown_click_count = 0
+        self.shown_suspicious = False
+
+        #Whether clicks are counted right now (a test has been started and hasn't ended)
+        self.accepting_clicks = False
 
-        #Load the click sound
+        #Raw input mode (count button presses and keyboard keys instead of the button's command) and its keys
+        self.raw_input = False
+        self.input_keys = ["z", "x"]
+
+        #Load the click sound (it's preprocessed once and cached on disk by the sound engine, not decoded on every click)
         self.click_sound = "click.wav"
+        self.sound = SoundEngine(cache=SoundCache("sound_cache"))
+
+        #Headless CPS test engine, with the award tiers (loaded from awards.json), earned awards and highest score
+        self.session = CpsSession(AwardRegistry.load("awards.json"))
+
+        #History of every finished test (appended to history.db)
+        self.history = SessionHistory("history.db")
+
+        #Statistics of the finished tests of the current profile, updated at the end of each test (loaded by set_profile())
+        self.totals = SessionStats()
+
+        #Player profiles, each with its own awards, highest score and best CPS per duration (stored in profiles.db, only the current
+        #one is loaded)
+        self.profiles = ProfileStore("profiles.db")
+        self.profile = None
 
-        #Awards and highest score
-        self.awards = []
-        self.highest_score = 0
+        #Crash-safe storage of the configuration (config.json), with debounced saves
+        self.config_store = ConfigStore("config.json", widget=self.master)
 
-        #Call the create_widgets() and update() methods
+        #Hot path profiler (only if "profiling" is enabled in config.json)
+        self.profiling = False
+        self.profiler = None
+
+        #Client of the shared leaderboard (only if a "leaderboard" server address is set in config.json)
+        self.leaderboard_address = ""
+        self.station = ""
+        self.leaderboard = None
+
+        #Call the load_config() and create_widgets() methods
         self.load_config()
+        self.connect_leaderboard()
+        if self.profiling:
+            self.enable_profiling()
         self.create_widgets()
-        self.update()
+        if self.profiler:
+            self.profile_widgets()
+
+        #Tell the user if awards.json is invalid (the built-in tiers are used)
+        if self.session.award_registry.error:
+            msgbox.showwarning(title="Invalid awards.json", message=self.session.award_registry.error)
+
+        #Timer that ends the test at its deadline and redraws the timer label while a test is running (nothing runs while idle)
+        self.timer = TestTimer(self.master, on_deadline=self.finish_test, on_redraw=self.update,
+                               redraw_delay=self.update_delay)
 
     def create_widgets(self):
         """Create the widgets."""
+        #Menu bar with a File menu to export and import the recorded sessions
+        self.menu_bar = tk.Menu(self.master)
+        self.menu_file = tk.Menu(self.menu_bar, tearoff=0)
+        self.menu_file.add_command(label="Export sessions...", command=self.export_sessions)
+        self.menu_file.add_command(label="Import sessions...", command=self.import_sessions)
+        self.menu_bar.add_cascade(label="File", menu=self.menu_file)
+        self.menu_profile = tk.Menu(self.menu_bar, tearoff=0)
+        self.menu_profile.add_command(label="Switch profile...", command=self.ask_profile)
+        self.menu_bar.add_cascade(label="Profile", menu=self.menu_profile)
+        self.master.config(menu=self.menu_bar)
+
         #Label to show the user how many CPS he got
         self.label_instructions = tk.Label(
             text="Enter test duration in seconds:", font=self.font)
@@ -124,13 +206,18 @@ class CPS_Test:
                                       command=self.click,
                                       state=tk.DISABLED,
                                       width=50,
-                                      height=15,
+                                      height=12,
                                       relief="flat",
                                       borderwidth=0,
                                       highlightthickness=0,
                                       bg="grey70",
                                       font=self.click_font)
-        self.button_click.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
+        self.button_click.place(relx=0.5, rely=0.45, anchor=tk.CENTER)
+
+        #Live graph of the CPS during the test, under the click button
+        self.canvas_graph = tk.Canvas(width=700, height=100, highlightthickness=0)
+        self.canvas_graph.place(relx=0.5, rely=0.8, anchor=tk.CENTER)
+        self.graph = LiveGraph(self.canvas_graph)
 
         #Button to start a new test
         self.button_new_test = ttk.Button(text="New Test",
@@ -154,15 +241,35 @@ class CPS_Test:
                                        command=self.change_update_delay)
         self.button_delay.place(relx=0.1, rely=0.91, anchor=tk.CENTER)
 
-        #Button to show the user his awards
-        self.button_awards = ttk.Button(text="Show awards",
-                                        command=self.show_awards)
-        self.button_awards.place(relx=0.9, rely=0.9, anchor=tk.CENTER)
+        #Checkbutton to use the raw input mode
+        self.raw_input_variable = tk.BooleanVar(value=self.raw_input)
+        self.check_raw_input = ttk.Checkbutton(text="Raw input (presses and {} keys)".format("/".join(key.upper() for key in self.input_keys)),
+                                               variable=self.raw_input_variable,
+                                               command=self.change_raw_input)
+        self.check_raw_input.place(relx=0.1, rely=0.865, anchor=tk.CENTER)
+
+        #Capture of the button presses and keys for the raw input mode
+        self.input_capture = RawInput(self.button_click, self.master, on_press=self.click, keys=self.input_keys)
+        self.set_raw_input(self.raw_input)
+
+        #Button to show the user his stats and awards
+        self.button_stats = ttk.Button(text="Show stats",
+                                       command=self.show_stats)
+        self.button_stats.place(relx=0.9, rely=0.9, anchor=tk.CENTER)
 
         #Button to change the click sound to a custom one
         self.button_sound = ttk.Button(text="Upload custom click sound", command=self.change_click_sound)
         self.button_sound.place(relx=0.9, rely=0.95, anchor=tk.CENTER)
 
+        #Label to show how late the end of the tests was detected
+        self.label_lateness = tk.Label(text="", font=("Roboto", 8), fg="grey40")
+        self.label_lateness.place(relx=0.5, rely=0.95, anchor=tk.CENTER)
+
+        #Button to show the profiler window (only if profiling is enabled)
+        if self.profiler:
+            self.button_profiler = ttk.Button(text="Show profiler", command=self.show_profiler)
+            self.button_profiler.place(relx=0.9, rely=0.85, anchor=tk.CENTER)
+
     def start_test(self):
         """Start the test."""
         #Get the duration the user submitted
@@ -171,34 +278,35 @@ class CPS_Test:
         try:
             #Add a keyword to reset all the awards easier
             if duration == "resetawards":
-                self.awards = []
-                self.highest_score = 0
+                self.session.reset_awards()
+                self.profiles.reset(self.profile)
+                self.session.awards = self.profile.awards
                 msgbox.showinfo(title="Success",
                                 message="Successfully reset all awards.")
 
             else:
-                #Convert the duration (string) into a float (number with decimal point)
-                self.duration = float(duration)
-
-                #Show the user an error message if the number is negative
-                if self.duration < 0:
-                    raise ValueError
+                #Convert the duration (string) into a float (number with decimal point) and prepare the test (a ValueError is raised
+                #if the number is negative)
+                self.session.start(float(duration))
 
                 #Tell the user the test will be infinite if the duration is zero
-                if self.duration == 0:
+                if self.session.duration == 0:
                     msgbox.showinfo(
                         title="Infinite clicking test",
                         message=
                         "Note that if you insert zero as duration, the test will be infinite, giving no CPS results."
                     )
 
-                #Convert the duration to a number, tell the user the test has started and change some buttons' states and add a click to the click count
+                #Decode the click sound now, so it isn't decoded on the first click
+                self.prepare_click_sound()
+
+                #Tell the user the test has started and change some buttons' states
                 self.label_instructions.config(text="Click as fast as you can!")
                 self.entry_duration.config(state=tk.DISABLED)
                 self.button_start.config(state=tk.DISABLED)
                 self.button_click.config(state=tk.NORMAL)
                 self.button_end.config(state=tk.NORMAL)
-                self.click_count = 1
+                self.accepting_clicks = True
 
         except (ValueError, TypeError):
             #Show the user an error message if the inserted duration is not a valid
@@ -208,131 +316,100 @@ class CPS_Test:
             )
             self.entry_duration.delete(0, tk.END)
 
-    def click(self):
-        """Detect the click and add it to the click count."""
-        #Set a start time if it hasn't been set yet
-        if not self.start_time:
-            self.start_time = time.time()
+    def click(self, timestamp=None, source="left"):
+        """Detect the click and add it to the click count. In raw input mode, the timestamp is the one of the press event and the source
+        is the input used ("left", "right" or "key")."""
+        #Record the click timestamp before doing anything else
+        if timestamp is None:
+            timestamp = time.perf_counter_ns()
+        if not self.accepting_clicks:
+            return
+
+        #If it's the first click, it starts the test, so arm the end-of-test deadline
+        #(the click count label is updated by the next redraw, not on every click)
+        first = self.session.click(timestamp, source)
+        if first is None:
+            #Made after the deadline, so it isn't counted and doesn't play the click sound
+            return
+        if first:
+            self.timer.start(self.session.duration, start=timestamp / 1e9)
         else:
-            #Add a click to the click count and update the label
-            self.click_count += 1
-            self.label_clicks.config(
-                text="Clicks: {}".format(self.click_count))
-            pygame.mixer.Sound(self.click_sound).play()
-
-    def update(self):
-        """Update the program."""
-        #If the duration time has elapsed, end the test and show the user how many CPS he got
-        if self.start_time and not self.end_time and time.time() - self.start_time >= self.duration:
-            self.end_time = time.time()
-
-            #Calculate the CPS
-            cps = self.click_count / self.duration
-
-            #If the user got certain amount of CPS, give him an award and tell him so
-
-            #Normal clicker award: 5-6 CPS
-            if cps >= 5 and cps <= 6 and not "Normal clicker (get 5-6 CPS in a test)" in self.awards:
-                self.awards.append("Normal clicker (get 5-6 CPS in a test)")
-                msgbox.showinfo(
-                    title="Gained new award!",
-                    message=
-                    "You gained the \"Normal clicker (get 5-6 CPS in a test)\" award!"
-                )
-
-            #Fast clicker award: 7-9 CPS
-            elif cps >= 7 and cps <= 9 and not "Fast clicker (get 7-9 CPS in a test)" in self.awards:
-                self.awards.append("Fast clicker (get 7-9 CPS in a test)")
-                msgbox.showinfo(
-                    title="Gained new award!",
-                    message=
-                    "You gained the \"Fast clicker (get 7-9 CPS in a test)\" award!"
-                )
-
-            #Jitter clicker award: 10-12 CPS
-            elif cps >= 10 and cps <= 12 and not "Jitter clicker (get 10-12 CPS in a test)" in self.awards:
-                self.awards.append("Jitter clicker (get 10-12 CPS in a test)")
-                msgbox.showinfo(
-                    title="Gained new award!",
-                    message=
-                    "You gained the \"Jitter clicker (get 10-12 CPS in a test)\" award!"
-                )
-
-            #Butterfly clicker award: 13-16 CPS
-            elif cps >= 13 and cps <= 16 and not "Butterfly clicker (get 13-16 CPS in a test)" in self.awards:
-                self.awards.append(
-                    "Butterfly clicker (get 13-16 CPS in a test)")
-                msgbox.showinfo(
-                    title="Gained new award!",
-                    message=
-                    "You gained the \"Butterfly clicker (get 13-16 CPS in a test)\" award!"
-                )
-
-            #True butterfly clicker award: 17-22 CPS
-            elif cps >= 17 and cps <= 22 and not "True butterfly clicker (get 17-22 CPS in a test)" in self.awards:
-                self.awards.append(
-                    "True butterfly clicker (get 17-22 CPS in a test)")
-                msgbox.showinfo(
-                    title="Gained new award!",
-                    message=
-                    "You gained the \"True butterfly clicker (get 17-22 CPS in a test)\" award!"
-                )
-
-            #Drag clicker award: 23-30 CPS
-            elif cps >= 23 and cps <= 30 and not "Drag clicker (get 23-30 CPS in a test)" in self.awards:
-                self.awards.append("Drag clicker (get 23-30 CPS in a test)")
-                msgbox.showinfo(
-                    title="Gained new award!",
-                    message=
-                    "You gained the \"Drag clicker (get 23-30 CPS in a test)\" award!"
-                )
-
-            #Bolt clicker award: 31-40 CPS
-            elif cps >= 31 and cps <= 40 and not "Bolt clicker (get 31-40 CPS in a test)" in self.awards:
-                self.awards.append("Bolt clicker (get 31-40 CPS in a test)")
-                msgbox.showinfo(
-                    title="Gained new award!",
-                    message=
-                    "You gained the \"Bolt clicker (get 31-40 CPS in a test)\" award!"
-                )
-
-            #Autoclicker award: 41+ CPS
-            elif cps >= 41 and not "Autoclicker clicker (get 41+ CPS in a test)" in self.awards:
-                self.awards.append(
-                    "Autoclicker clicker (get 41+ CPS in a test)")
-                msgbox.showinfo(
-                    title="Congratulations, you cheater!",
-                    message=
-                    "You gained the \"Autoclicker clicker (get 41+ CPS in a test)\" award!"
-                )
-            
-            #Check if the user has beaten his highest score
-            if cps > self.highest_score:
-                previous_highest_score = self.highest_score
-                self.highest_score = cps
+            self.sound.play()
+
+    def finish_test(self):
+        """End the test when its deadline is reached and show the user how many CPS he got."""
+        if self.session.running:
+            #Stop counting clicks and calculate the CPS, statistics, award and highest score
+            self.accepting_clicks = False
+            result = self.session.finish()
+            cps = result.cps
+            self.stats = result.stats
+
+            #Append the test to the history
+            self.history.record(result.duration, result.click_count, cps, self.session.clicks.timestamps())
+
+            #Update the statistics shown in the stats window, then save them with the awards, highest score and best CPS of the profile
+            self.totals.add(result.duration, result.click_count, cps, self.session.award_registry.award_for(cps))
+            self.profile.awards = self.session.awards
+            self.profile.highest_score = self.session.highest_score
+            self.profiles.record(self.profile, result.duration, cps)
+
+            #Send the result to the leaderboard (it's queued and sent in the background)
+            if self.leaderboard:
+                self.leaderboard.submit(result.duration, cps, click_count=result.click_count)
+
+            #If the user got a new award, tell him so
+            if result.award:
+                msgbox.showinfo(title=result.award.title, message=result.award.message)
+
+            #Tell the user if he has beaten his highest score
+            if result.new_highest_score:
                 msgbox.showinfo(
                     title="New highest score!",
-                    message=f"You've beaten your previous CPS record of {previous_highest_score} CPS, with {self.highest_score} CPS!"
+                    message=f"You've beaten your previous CPS record of {result.previous_highest_score} CPS, with {cps} CPS!"
                 )
 
             #Show the CPS to the user
             self.label_instructions.config(
-                text="Your CPS is: {:.2f}".format(cps))
+                text="Your CPS is: {:.2f} (peak: {:.0f} CPS, jitter: {:.1f} ms, bursts: {})".format(
+                    cps, self.stats.peak_cps, self.stats.jitter * 1000, len(self.stats.bursts)))
             self.button_click.config(text="{:.2f} CPS".format(cps))
 
+            #Remind the user if the clicks looked machine-like
+            if result.suspicious:
+                self.label_instructions.config(
+                    text=self.label_instructions.cget("text") + " - machine-like clicking: {}".format(result.suspicious))
+
             #Disable the Click button and the end button and enable the new test button again
             self.button_click.config(state=tk.DISABLED)
             self.button_end.config(state=tk.DISABLED)
             self.button_new_test.config(state=tk.NORMAL)
-        else:
-            #Calculate elapsed time and update the timer label
-            if self.start_time and not self.end_time:
-                elapsed_time = time.time() - self.start_time
-                self.label_timer.config(
-                    text="Time: {:.2f}".format(elapsed_time))
 
-        #Keep updating every 10 milliseconds
-        self.master.after(self.update_delay, self.update)
+            #Show how late the end of the test was detected
+            self.label_timer.config(text="Time: {:.2f}".format(result.duration))
+            if self.raw_input:
+                self.label_clicks.config(text="Clicks: {} (left: {}, right: {}, keys: {})".format(
+                    result.click_count, result.inputs["left"], result.inputs["right"], result.inputs["key"]))
+            else:
+                self.label_clicks.config(text="Clicks: {}".format(result.click_count))
+            self.label_lateness.config(text=self.timer.report())
+
+    def update(self):
+        """Redraw the click count and timer labels and the live graph. Called by the timer every update_delay milliseconds, only while a
+        test is running."""
+        if self.session.running:
+            now = time.perf_counter_ns()
+            if self.session.click_count != self.shown_click_count:
+                self.shown_click_count = self.session.click_count
+                self.label_clicks.config(
+                    text="Clicks: {}".format(self.shown_click_count))
+            self.label_timer.config(
+                text="Time: {:.2f}".format(self.session.elapsed(now)))
+            if self.session.detector.flagged and not self.shown_suspicious:
+                self.shown_suspicious = True
+                self.label_instructions.config(
+                    text="Machine-like clicking detected: {}".format(self.session.detector.flagged))
+            self.graph.refresh(now, self.session.clicks, self.session.start_time)
 
     def new_test(self):
         """Start a new CPS test."""
@@ -348,15 +425,18 @@ class CPS_Test:
         self.label_clicks.config(text="Clicks: 0")
         self.label_timer.config(text="Time: 0.00")
 
-        #Reset all variables
-        self.click_count = 0
-        self.start_time = None
-        self.end_time = None
+        #Reset the test and the graph
+        self.session.reset()
+        self.shown_click_count = 0
+        self.shown_suspicious = False
+        self.graph.reset()
 
     def end_test(self):
         """Abort the test."""
-        #Stop the test
-        self.end_time = time.time()
+        #Stop the test and the timer
+        self.timer.cancel()
+        self.accepting_clicks = False
+        self.session.abort()
         self.label_instructions.config(text="Test aborted.")
 
         #Enable the new test button
@@ -374,11 +454,16 @@ class CPS_Test:
         self.label_timer.config(text="Time: 0.00")
 
     def change_update_delay(self):
-        """Change the update delay to the desired amount. Note: Don't use zero or a negative number,
-        the program will crash. I repeat, it's not a bug, it's common sense."""
+        """Change the update delay (how often the timer label is redrawn during a test) to the desired amount. Zero or negative
+        numbers are rejected."""
         #Try getting the update delay from the entry_delay entry
         try:
-            self.update_delay = int(self.entry_delay.get())
+            update_delay = int(self.entry_delay.get())
+            if update_delay <= 0:
+                raise ValueError
+            self.update_delay = update_delay
+            self.timer.redraw_delay = update_delay
+            self.save_config(close=False)
         #If any error is raisen, tell the user the input is invalid
         except ValueError:
             msgbox.showerror(
@@ -394,66 +479,283 @@ class CPS_Test:
                 f"Successfully chnaged the update delay to {self.update_delay} milliseconds."
             )
 
-    def show_awards(self):
-        """Show the user all the awards he has got."""
-        #Create a new toplevel window
-        awards_window = tk.Toplevel()
-        awards_window.title("Current awards")
-        awards_window.iconbitmap("awards.ico")
-        awards_window.geometry("400x300+760+390")
+    def export_sessions(self):
+        """Export every recorded session (with its click timestamps) to a .cpsx folder of memory-mappable NumPy files."""
+        path = filedialog.asksaveasfilename(
+            title="Export sessions",
+            defaultextension=".cpsx",
+            initialfile="sessions.cpsx",
+            filetypes=(("CPS test sessions", "*.cpsx"), ("All files", "*.*")),
+        )
+        if path:
+            #Imported here, so NumPy isn't loaded when the app starts
+            from export import export_sessions
+            try:
+                count = export_sessions(self.history, path)
+            except OSError as e:
+                msgbox.showerror(title="Error", message=f"Error: {e}")
+            else:
+                msgbox.showinfo(title="Success", message=f"Successfully exported {count} sessions to {path}")
+
+    def import_sessions(self):
+        """Append the sessions of a .cpsx folder to the history."""
+        path = filedialog.askdirectory(title="Import sessions (select a .cpsx folder)")
+        if path:
+            from export import import_sessions
+            last_id = self.history.last_id()
+            try:
+                count = import_sessions(self.history, path)
+            except (OSError, ValueError) as e:
+                msgbox.showerror(title="Error", message=f"Error: {e}")
+            else:
+                #Add the imported sessions to the statistics of the current profile
+                self.totals.add_history(self.history, self.session.award_registry, after_id=last_id)
+                self.profiles.save(self.profile)
+                msgbox.showinfo(title="Success", message=f"Successfully imported {count} sessions from {path}")
+
+    def set_raw_input(self, raw_input):
+        """Use the raw input mode (press events and keys, timed with the event timestamps) or the button's command."""
+        self.raw_input = raw_input
+        if raw_input:
+            self.button_click.config(command="")
+            self.input_capture.bind()
+        else:
+            self.input_capture.unbind()
+            self.button_click.config(command=self.click)
 
-        #Create a new string where all the gained awards will be shown
-        if not self.awards:
-            current_awards = "Not gained any award yet. Start a new test to gain new awards!"
+    def change_raw_input(self):
+        """Called when the raw input checkbutton is toggled."""
+        self.set_raw_input(self.raw_input_variable.get())
+        self.save_config(close=False)
+
+    def show_stats(self):
+        """Show the user his statistics and all the awards he has got. Everything comes from the aggregates updated at the end of each
+        test, so the window doesn't read the history."""
+        #Create a new toplevel window
+        stats_window = tk.Toplevel()
+        stats_window.title("Stats and awards")
+        stats_window.iconbitmap("awards.ico")
+        stats_window.geometry("460x660+730+210")
+
+        #Create a label to show the user's highest score and averages
+        if self.totals.tests:
+            summary = "Tests: {}, clicks: {}, time clicking: {:.0f} s\nAverage CPS: {:.2f}, highest score: {} CPS".format(
+                self.totals.tests, self.totals.clicks, self.totals.seconds, self.totals.average_cps(), self.session.highest_score)
+        else:
+            summary = f"No tests yet. highest score: {self.session.highest_score} CPS"
+        tk.Label(stats_window, text=summary).pack()
+
+        #Create a table with the personal best and the average of each duration
+        durations_table = ttk.Treeview(stats_window, columns=("tests", "average", "best"), height=5)
+        durations_table.heading("#0", text="Duration")
+        durations_table.heading("tests", text="Tests")
+        durations_table.heading("average", text="Average CPS")
+        durations_table.heading("best", text="Best CPS")
+        for column in ("#0", "tests", "average", "best"):
+            durations_table.column(column, width=100, anchor=tk.CENTER)
+        for duration, tests, average, best in self.totals.per_duration():
+            durations_table.insert("", tk.END, text=f"{duration:g} s", values=(tests, f"{average:.2f}", f"{best:.2f}"))
+        durations_table.pack(pady=5)
+
+        #Draw the CPS of the last tests and their trend line
+        trend_canvas = tk.Canvas(stats_window, width=420, height=120, bg="white", highlightthickness=1, highlightbackground="grey70")
+        trend_canvas.pack()
+        recent = list(self.totals.recent)
+        if len(recent) >= 2:
+            top = max(recent) * 1.1 or 1
+            step = 420 / (len(recent) - 1)
+            def y(cps):
+                return 120 - cps / top * 120
+            trend_canvas.create_line(*[coordinate for index, cps in enumerate(recent) for coordinate in (index * step, y(cps))],
+                                     fill="royal blue")
+            slope, intercept = self.totals.trend()
+            trend_canvas.create_line(0, y(intercept), 420, y(intercept + slope * (len(recent) - 1)), fill="orange red", dash=(4, 2))
+            trend_canvas.create_text(4, 4, anchor=tk.NW, text="Last {} tests (trend: {:+.2f} CPS per test)".format(len(recent), slope),
+                                     font=("Roboto", 8))
         else:
-            current_awards = "\n".join("- " + award for award in self.awards)
-        
-        #Create a label to show the user's highest score
-        highest_score_label = tk.Label(awards_window, text=f"highest score: {self.highest_score} CPS")
-        highest_score_label.pack()
+            trend_canvas.create_text(210, 60, text="Finish at least two tests to see the trend")
+
+        #Create a label to show where the profile's best CPS of each duration ranks among every profile
+        ranks = []
+        for duration, best in self.profiles.bests(self.profile).items():
+            percentile, count = self.profiles.percentile(duration, best)
+            ranks.append("{:g} s: {:.2f} CPS, #{} of {} profiles (better than {:.0f}%)".format(
+                duration, best, self.profiles.rank(duration, best), count, percentile))
+        if ranks:
+            tk.Label(stats_window, text=f"Best results of {self.profile.name}:\n" + "\n".join(ranks), justify=tk.LEFT).pack(pady=5)
+
+        #Create a label to show how many tests fell into each award tier
+        tier_counts = [f"Below every tier: {self.totals.tiers.get(NO_TIER, 0)}"]
+        tier_counts += [f"{award.name}: {self.totals.tiers.get(award.name, 0)}" for award in self.session.award_registry.awards]
+        tk.Label(stats_window, text="Tests per tier:\n" + "\n".join(tier_counts), justify=tk.LEFT).pack(pady=5)
 
         #Create a label to show the string with the awards
-        awards_label = tk.Label(awards_window, text=current_awards)
-        awards_label.pack()
+        if not self.session.awards:
+            current_awards = "Not gained any award yet. Start a new test to gain new awards!"
+        else:
+            current_awards = "Awards:\n" + "\n".join("- " + award for award in self.session.award_registry.ordered(self.session.awards))
+        tk.Label(stats_window, text=current_awards).pack()
 
         #Create a button to close the toplevel window
-        ok_button = ttk.Button(awards_window, text="OK", command=awards_window.destroy)
+        ok_button = ttk.Button(stats_window, text="OK", command=stats_window.destroy)
         ok_button.pack()
 
-    def save_config(self, close:bool):
-        """Save the user's configuration to the config.json file."""
-        #Create a dictionary for better organization
-        data = {
-            "awards": self.awards,
-            "highest_score": self.highest_score,
+    def set_profile(self, profile):
+        """Use the awards and highest score of the profile."""
+        self.profile = profile
+        self.session.awards = profile.awards
+        self.session.highest_score = profile.highest_score
+        self.totals = profile.stats
+        self.master.title(f"CPS Test - {profile.name}")
+
+    def ask_profile(self):
+        """Ask the user for the name of a profile and switch to it, creating it if it doesn't exist."""
+        if self.accepting_clicks:
+            msgbox.showerror(title="Error", message="Finish or end the test before switching profiles.")
+            return
+        name = simpledialog.askstring("Switch profile", "Profile name (a new profile is created if it doesn't exist):",
+                                      initialvalue=self.profile.name, parent=self.master)
+        if name:
+            try:
+                self.set_profile(self.profiles.open(name.strip()))
+            except ValueError as e:
+                msgbox.showerror(title="Error", message=f"Error: {e}")
+                return
+            self.save_config(close=False)
+
+    def connect_leaderboard(self):
+        """Start the leaderboard client if a server address ("host:port") is set in the configuration."""
+        if not self.leaderboard_address:
+            return
+        from leaderboard import LeaderboardClient
+        host, _, port = self.leaderboard_address.rpartition(":")
+        try:
+            self.leaderboard = LeaderboardClient(host or "127.0.0.1", int(port), station=self.station or None)
+        except ValueError:
+            msgbox.showerror(title="Error", message=f"Invalid leaderboard address: {self.leaderboard_address}")
+
+    def enable_profiling(self):
+        """Wrap the hot path methods with the profiler. Must be called before the widgets and the timer are created, so they use the
+        wrapped methods."""
+        self.profiler = Profiler()
+        self.click = self.profiler.wrap("click", self.click)
+        self.update = self.profiler.wrap("update", self.update)
+        self.sound.play = self.profiler.wrap("sound", self.sound.play)
+
+    def profile_widgets(self):
+        """Wrap the config() method of the labels redrawn during a test with the profiler."""
+        for label in (self.label_clicks, self.label_timer):
+            label.config = self.profiler.wrap("redraw", label.config)
+
+    def show_profiler(self):
+        """Show the profiler summary, with buttons to refresh it, reset it and export the trace."""
+        #Create a new toplevel window
+        profiler_window = tk.Toplevel()
+        profiler_window.title("Profiler")
+        profiler_window.geometry("560x260+680+410")
+
+        #Create a label to show the summary table
+        summary_label = tk.Label(profiler_window, text=self.profiler.summary(), font=("Courier", 10), justify=tk.LEFT)
+        summary_label.pack(pady=10)
+
+        def refresh():
+            summary_label.config(text=self.profiler.summary())
+
+        def reset():
+            self.profiler.reset()
+            refresh()
+
+        def export():
+            file = filedialog.asksaveasfilename(
+                title="Export Chrome trace",
+                defaultextension=".json",
+                initialfile="cps_trace.json",
+                filetypes=(("JSON files", "*.json"), ("All files", "*.*")),
+            )
+            if file:
+                self.profiler.export_chrome_trace(file)
+                msgbox.showinfo(title="Success", message=f"Successfully exported the trace to {file}")
+
+        #Create the buttons to refresh, reset, export and close the window
+        ttk.Button(profiler_window, text="Refresh", command=refresh).pack()
+        ttk.Button(profiler_window, text="Reset", command=reset).pack()
+        ttk.Button(profiler_window, text="Export trace", command=export).pack()
+        ttk.Button(profiler_window, text="OK", command=profiler_window.destroy).pack()
+
+    def config_data(self):
+        """Return the user's configuration as a dictionary."""
+        return {
+            "profile": self.profile.name,
             "click_sound": self.click_sound,
-            "update_delay": self.update_delay
+            "update_delay": self.update_delay,
+            "profiling": self.profiling,
+            "raw_input": self.raw_input,
+            "input_keys": self.input_keys,
+            "leaderboard": self.leaderboard_address,
+            "station": self.station
         }
 
-        #Dump all the data to the config.json file
-        with open("config.json", "w") as file:
-            json.dump(data, file, indent=4)
-
-        #Close the program if the close parameter is true
-        if close:
-            self.master.destroy()
+    def save_config(self, close:bool):
+        """Save the user's configuration to the config.json file. If the close parameter is false, the save is debounced, so several
+        changes in a row cause a single write."""
+        if not close:
+            self.config_store.save_later(self.config_data)
+            return
+
+        #Save immediately, then close the history, the profiles, the leaderboard client and the program
+        self.config_store.save(self.config_data())
+        self.history.close()
+        self.profiles.close()
+        if self.leaderboard:
+            self.leaderboard.close()
+        self.master.destroy()
 
     def load_config(self):
-        """Load the user's configuration from the config.json file."""
+        """Load the user's configuration from the config.json file (or from its last good snapshot if it's corrupt). Missing values are
+        set to their defaults."""
+        data = self.config_store.load()
+        name = config_value(data, "profile", DEFAULT_PROFILE, str).strip() or DEFAULT_PROFILE
+        profile = self.profiles.load(name)
+        if profile is None:
+            #The first launch with profiles moves the awards, highest score and statistics of config.json (schema version 1) into the
+            #profile (the statistics are built from the history if they were never saved)
+            try:
+                stats = SessionStats.from_dict(data["stats"])
+            except (KeyError, ValueError):
+                stats = SessionStats.from_history(self.history, self.session.award_registry)
+            awards = config_value(data, "awards", [], list, lambda awards: all(isinstance(award, str) for award in awards))
+            highest_score = config_value(data, "highest_score", 0, (int, float), lambda score: score >= 0)
+            profile = self.profiles.create(name, awards, highest_score, stats)
+        self.set_profile(profile)
+
+        #Every value falls back to its default if it has the wrong type
+        self.click_sound = config_value(data, "click_sound", "click.wav", str, bool)
+        self.update_delay = config_value(data, "update_delay", 10, int, lambda delay: delay > 0)
+        self.profiling = config_value(data, "profiling", False, bool)
+        self.raw_input = config_value(data, "raw_input", False, bool)
+        self.input_keys = config_value(data, "input_keys", ["z", "x"], list,
+                                       lambda keys: all(isinstance(key, str) and key for key in keys))
+        self.leaderboard_address = config_value(data, "leaderboard", "", str)
+        self.station = config_value(data, "station", "", str)
+
+        #Set the click sound (it's decoded when the first test starts)
+        self.sound.load(self.click_sound)
+
+    def prepare_click_sound(self):
+        """Decode the click sound if it isn't decoded yet, falling back to the default one if the custom sound can't be loaded."""
         try:
-            #Try to get the data from the config.json
-            with open("config.json", "r") as file:
-                data = json.load(file)
-                self.awards = data.get("awards", [])
-                self.highest_score = data.get("highest_score", 0)
-                self.click_sound = data.get("click_sound", "click.wav")
-                self.update_delay = data.get("update_delay", 10)
-        except FileNotFoundError:
-            #If the files doesn't exist, set some default values
-            self.awards = []
-            self.highest_score = 0
+            self.sound.prepare()
+        except (SoundError, OSError) as e:
+            if self.click_sound == "click.wav":
+                return
+            msgbox.showerror(title="Error", message=f"Can't load the custom click sound, using the default one.\nError: {e}")
             self.click_sound = "click.wav"
-            self.update_delay = 10
+            self.sound.load(self.click_sound)
+            self.save_config(close=False)
+            try:
+                self.sound.prepare()
+            except (SoundError, OSError):
+                pass
 
     def change_click_sound(self):
         """Changes the click sound to a custom one by uploading a WAV or MP3 file."""
@@ -472,8 +774,12 @@ class CPS_Test:
 
             #Change the click sound to the new one if there aren't any errors
             try:
+                self.sound.load(file)
+                self.sound.prepare()
                 self.click_sound = file
-            except pygame.error as e:
+            except (SoundError, OSError) as e:
+                #Keep the previous click sound
+                self.sound.load(self.click_sound)
                 #Show the user an error message if there's an error
                 msgbox.showerror(
                     title="Error", 
@@ -492,5 +798,6 @@ class CPS_Test:
         """Run the program"""
         self.master.mainloop()
 
-#Run the program by calling the run() method
-CPS_Test().run()
\ No newline at end of file
+#Run the program by calling the run() method (only if this file is run, not when it's imported)
+if __name__ == "__main__":
+    CPS_Test().run()
\ No newline at end of file
@@ -0,0 +1,168 @@
+"""
+Named player profiles for the CPS test.
+
+Each profile has its own awards, highest score, statistics (a SessionStats) and best CPS for each duration. The profiles are stored in an
+SQLite database (profiles.db) instead of config.json, so startup only reads the current profile (a lookup in the unique index of the names)
+no matter how many profiles there are, and a finished test only updates the rows of one profile. The best CPS of every profile are indexed by (duration, cps).
+
+Rank queries ("what percentile is this CPS among all profiles for 10-second tests") use a sorted array of the best CPS of every profile for
+the duration, read in order from that index the first time it's needed and then kept up to date as results come in, so a query is a bisect.
+"""
+
+import bisect, json, sqlite3
+from dataclasses import dataclass, field
+
+from stats import SessionStats
+
+#Name of the profile used when none has been chosen
+DEFAULT_PROFILE = "Default"
+
+
+@dataclass
+class Profile:
+    id: int
+    name: str
+    awards: set = field(default_factory=set)
+    highest_score: float = 0
+    stats: SessionStats = field(default_factory=SessionStats)
+
+
+class ProfileStore:
+    def __init__(self, path="profiles.db"):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute("""CREATE TABLE IF NOT EXISTS profiles (
+                                           id INTEGER PRIMARY KEY,
+                                           name TEXT NOT NULL UNIQUE,
+                                           awards TEXT NOT NULL DEFAULT '[]',
+                                           highest_score REAL NOT NULL DEFAULT 0,
+                                           stats TEXT
+                                       )""")
+            #Databases created before the statistics were stored per profile don't have the stats column
+            if "stats" not in [column[1] for column in self.connection.execute("PRAGMA table_info(profiles)")]:
+                self.connection.execute("ALTER TABLE profiles ADD COLUMN stats TEXT")
+            self.connection.execute("""CREATE TABLE IF NOT EXISTS best_scores (
+                                           profile_id INTEGER NOT NULL REFERENCES profiles (id),
+                                           duration REAL NOT NULL,
+                                           cps REAL NOT NULL,
+                                           PRIMARY KEY (profile_id, duration)
+                                       )""")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS best_scores_duration_cps ON best_scores (duration, cps)")
+
+        #{duration: sorted list of the best CPS of every profile}, filled the first time each duration is ranked
+        self.ranked = {}
+
+    def load(self, name):
+        """Return the profile with the given name, or None if it doesn't exist."""
+        row = self.connection.execute("SELECT id, name, awards, highest_score, stats FROM profiles WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        profile_id, name, awards, highest_score, stats = row
+        try:
+            stats = SessionStats.from_dict(json.loads(stats)) if stats else SessionStats()
+        except ValueError:
+            #Malformed statistics are started again instead of making the profile unusable
+            stats = SessionStats()
+        return Profile(profile_id, name, set(json.loads(awards)), highest_score, stats)
+
+    def create(self, name, awards=(), highest_score=0, stats=None):
+        """Create a profile and return it. Raises ValueError if the name is empty or already used."""
+        if stats is None:
+            stats = SessionStats()
+        name = name.strip()
+        if not name:
+            raise ValueError("The profile name can't be empty")
+        try:
+            with self.connection:
+                cursor = self.connection.execute("INSERT INTO profiles (name, awards, highest_score, stats) VALUES (?, ?, ?, ?)",
+                                                 (name, json.dumps(sorted(awards)), highest_score, json.dumps(stats.to_dict())))
+        except sqlite3.IntegrityError:
+            raise ValueError(f"There's already a profile called \"{name}\"") from None
+        return Profile(cursor.lastrowid, name, set(awards), highest_score, stats)
+
+    def open(self, name):
+        """Return the profile with the given name, creating it if it doesn't exist."""
+        return self.load(name) or self.create(name)
+
+    def save(self, profile):
+        """Save the awards, highest score and statistics of the profile."""
+        with self.connection:
+            self.update(profile)
+
+    def update(self, profile):
+        """Update the row of the profile (inside the caller's transaction)."""
+        self.connection.execute("UPDATE profiles SET awards = ?, highest_score = ?, stats = ? WHERE id = ?",
+                                (json.dumps(sorted(profile.awards)), profile.highest_score, json.dumps(profile.stats.to_dict()),
+                                 profile.id))
+
+    def record(self, profile, duration, cps):
+        """Save the awards, highest score and statistics of the profile and, if the CPS is its best for the duration, its new best, in a
+        single transaction. Returns True if it was a new best."""
+        row = self.connection.execute("SELECT cps FROM best_scores WHERE profile_id = ? AND duration = ?",
+                                      (profile.id, duration)).fetchone()
+        previous_best = row[0] if row else None
+        new_best = previous_best is None or cps > previous_best
+        with self.connection:
+            self.update(profile)
+            if new_best:
+                self.connection.execute("INSERT OR REPLACE INTO best_scores (profile_id, duration, cps) VALUES (?, ?, ?)",
+                                        (profile.id, duration, cps))
+
+        #Keep the sorted array of the duration up to date (if it has been read already)
+        ranked = self.ranked.get(duration)
+        if new_best and ranked is not None:
+            if previous_best is not None:
+                del ranked[bisect.bisect_left(ranked, previous_best)]
+            bisect.insort(ranked, cps)
+        return new_best
+
+    def reset(self, profile):
+        """Forget the awards, highest score and best CPS of the profile (its statistics are kept)."""
+        profile.awards = set()
+        profile.highest_score = 0
+        bests = self.bests(profile)
+        with self.connection:
+            self.update(profile)
+            self.connection.execute("DELETE FROM best_scores WHERE profile_id = ?", (profile.id,))
+
+        #Take the old bests out of the sorted arrays that have been read already
+        for duration, best in bests.items():
+            ranked = self.ranked.get(duration)
+            if ranked is not None:
+                del ranked[bisect.bisect_left(ranked, best)]
+
+    def bests(self, profile):
+        """Return a {duration: best CPS} dictionary of the profile."""
+        return dict(self.connection.execute("SELECT duration, cps FROM best_scores WHERE profile_id = ? ORDER BY duration",
+                                            (profile.id,)))
+
+    def ranked_scores(self, duration):
+        """Return the sorted list of the best CPS of every profile for the duration."""
+        ranked = self.ranked.get(duration)
+        if ranked is None:
+            ranked = self.ranked[duration] = [cps for cps, in self.connection.execute(
+                "SELECT cps FROM best_scores WHERE duration = ? ORDER BY cps", (duration,))]
+        return ranked
+
+    def percentile(self, duration, cps):
+        """Return (percentile, profiles): the percentage of profiles whose best CPS for the duration is below the given CPS, and the
+        number of profiles with a result for the duration."""
+        ranked = self.ranked_scores(duration)
+        if not ranked:
+            return 0.0, 0
+        return 100 * bisect.bisect_left(ranked, cps) / len(ranked), len(ranked)
+
+    def rank(self, duration, cps):
+        """Return the position (1 is the best) the CPS would have among the best CPS of every profile for the duration."""
+        ranked = self.ranked_scores(duration)
+        return len(ranked) - bisect.bisect_right(ranked, cps) + 1
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def close(self):
+        """Close the database."""
+        self.connection.close()
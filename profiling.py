@@ -0,0 +1,115 @@
+"""
+Opt-in, low-overhead profiling of the CPS test's hot path.
+
+When profiling is enabled (set "profiling" to true in config.json), click(), update(), the label redraws and the click sound playback are
+timed with time.perf_counter_ns(). The durations go into fixed-size histograms (one bucket per power of two nanoseconds) and a fixed-size
+ring of recent events, so recording an event doesn't allocate anything. The summary can be seen in the profiler window and the recent events
+can be exported as Chrome trace-event JSON (open it in chrome://tracing or https://ui.perfetto.dev). When profiling is disabled nothing is
+wrapped, so there's no overhead at all.
+"""
+
+import json, os, time
+from array import array
+
+#Names of the timed spans
+SPANS = ("click", "update", "redraw", "sound")
+
+#Histogram buckets: bucket b counts the durations between 2 ** (b - 1) and 2 ** b nanoseconds
+BUCKETS = 48
+
+#Number of recent events kept for the trace export
+TRACE_SIZE = 1 << 16
+
+
+class Profiler:
+    def __init__(self, names=SPANS, trace_size=TRACE_SIZE):
+        self.names = list(names)
+        self.indexes = {name: index for index, name in enumerate(self.names)}
+        self.trace_size = trace_size
+        self.reset()
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        spans = len(self.names)
+        self.histograms = [array("Q", bytes(8 * BUCKETS)) for _ in range(spans)]
+        self.counts = array("Q", bytes(8 * spans))
+        self.totals = array("Q", bytes(8 * spans))
+        self.maxima = array("Q", bytes(8 * spans))
+
+        #Ring of recent events: span index, start and duration (in nanoseconds)
+        self.trace_spans = array("B", bytes(self.trace_size))
+        self.trace_starts = array("Q", bytes(8 * self.trace_size))
+        self.trace_durations = array("Q", bytes(8 * self.trace_size))
+        self.trace_position = 0
+        self.trace_total = 0
+
+    def record(self, index, start, end):
+        """Record a span (by index) that started and ended at the given perf_counter_ns timestamps."""
+        duration = end - start
+        self.histograms[index][min(duration.bit_length(), BUCKETS - 1)] += 1
+        self.counts[index] += 1
+        self.totals[index] += duration
+        if duration > self.maxima[index]:
+            self.maxima[index] = duration
+
+        position = self.trace_position
+        self.trace_spans[position] = index
+        self.trace_starts[position] = start
+        self.trace_durations[position] = duration
+        self.trace_position = (position + 1) % self.trace_size
+        self.trace_total += 1
+
+    def wrap(self, name, function):
+        """Return a function that calls the given one and records how long it took under the given span name."""
+        index = self.indexes[name]
+        record = self.record
+        clock = time.perf_counter_ns
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(index, start, clock())
+
+        return timed
+
+    def percentile(self, index, fraction):
+        """Upper bound (in nanoseconds) of the histogram bucket that holds the given fraction of the span's durations."""
+        target = self.counts[index] * fraction
+        seen = 0
+        for bucket, count in enumerate(self.histograms[index]):
+            seen += count
+            if count and seen >= target:
+                return 1 << bucket
+        return 0
+
+    def summary(self):
+        """Return a text table with the count, mean, p50, p99 and maximum duration of every span."""
+        lines = [f"{'Span':<8}{'Count':>9}{'Mean':>12}{'p50 <':>12}{'p99 <':>12}{'Max':>12}"]
+        for index, name in enumerate(self.names):
+            count = self.counts[index]
+            mean = self.totals[index] / count if count else 0
+            lines.append(f"{name:<8}{count:>9}{mean / 1000:>10.1f}us{self.percentile(index, 0.5) / 1000:>10.1f}us"
+                         f"{self.percentile(index, 0.99) / 1000:>10.1f}us{self.maxima[index] / 1000:>10.1f}us")
+        return "\n".join(lines)
+
+    def trace_events(self):
+        """Return the recent events as Chrome trace events (complete "X" events, in microseconds), from the oldest to the newest."""
+        kept = min(self.trace_total, self.trace_size)
+        first = (self.trace_position - kept) % self.trace_size
+        events = []
+        for offset in range(kept):
+            position = (first + offset) % self.trace_size
+            events.append({"name": self.names[self.trace_spans[position]],
+                           "ph": "X",
+                           "ts": self.trace_starts[position] / 1000,
+                           "dur": self.trace_durations[position] / 1000,
+                           "pid": os.getpid(),
+                           "tid": 1})
+        return events
+
+    def export_chrome_trace(self, path):
+        """Write the recent events to a Chrome trace-event JSON file."""
+        with open(path, "w") as file:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ns"}, file)
@@ -0,0 +1,98 @@
+"""
+Low-latency raw input capture for the CPS test.
+
+A tk.Button's command only runs when the mouse button is released inside the button, so fast butterfly or drag clicks can be lost or
+counted late. In raw input mode, clicks are captured from <ButtonPress> events (left and right buttons) on the click button and from
+<KeyPress> events of configurable keyboard keys, and each click is timed with the timestamp of the event itself (converted to the
+perf_counter_ns clock), not with the time the handler happened to run. Held keys repeated by the keyboard's auto-repeat are ignored.
+"""
+
+import time
+
+#X11 event times are 32 bit milliseconds, so they wrap around every ~49.7 days
+EVENT_TIME_WRAP = 1 << 32
+
+
+class EventClock:
+    """Converts Tk event times (milliseconds) to perf_counter_ns timestamps. The offset between both clocks is the smallest one seen, which
+    is the one of the event handled with the least delay. Since the offset can shrink after an event that waited in the queue, the returned
+    timestamps are never earlier than the previous one."""
+
+    def __init__(self):
+        self.offset = None
+        self.last_event_time = None
+        self.last = None
+        self.wraps = 0
+
+    def timestamp(self, event_time):
+        """Return the perf_counter_ns timestamp of an event from its Tk event time."""
+        now = time.perf_counter_ns()
+        if self.last_event_time is not None and event_time < self.last_event_time - EVENT_TIME_WRAP // 2:
+            self.wraps += 1
+        self.last_event_time = event_time
+        event_ns = (event_time + self.wraps * EVENT_TIME_WRAP) * 1_000_000
+
+        offset = now - event_ns
+        if self.offset is None or offset < self.offset:
+            self.offset = offset
+        timestamp = min(event_ns + self.offset, now)
+        if self.last is not None and timestamp < self.last:
+            timestamp = self.last
+        self.last = timestamp
+        return timestamp
+
+
+class RawInput:
+    def __init__(self, button, root, on_press, keys=("z", "x")):
+        #The click button, the window that receives the key events, the function called with (timestamp, source) and the keys
+        self.button = button
+        self.root = root
+        self.on_press = on_press
+        self.keys = {key.lower() for key in keys}
+        self.clock = EventClock()
+
+        #Keys currently held down and the time of their last release (to detect auto-repeat)
+        self.held_keys = set()
+        self.released_at = {}
+        self.bindings = []
+
+    def bind(self):
+        """Start capturing the press events."""
+        if self.bindings:
+            return
+        self.bindings = [
+            (self.button, "<ButtonPress-1>", self.button.bind("<ButtonPress-1>", self.left_press, add="+")),
+            (self.button, "<ButtonPress-3>", self.button.bind("<ButtonPress-3>", self.right_press, add="+")),
+            (self.root, "<KeyPress>", self.root.bind("<KeyPress>", self.key_press, add="+")),
+            (self.root, "<KeyRelease>", self.root.bind("<KeyRelease>", self.key_release, add="+")),
+        ]
+
+    def unbind(self):
+        """Stop capturing the press events."""
+        for widget, sequence, function_id in self.bindings:
+            widget.unbind(sequence, function_id)
+        self.bindings = []
+        self.held_keys.clear()
+
+    def left_press(self, event):
+        self.on_press(self.clock.timestamp(event.time), "left")
+
+    def right_press(self, event):
+        self.on_press(self.clock.timestamp(event.time), "right")
+
+    def key_press(self, event):
+        key = event.keysym.lower()
+        if key not in self.keys:
+            return
+
+        #Ignore the presses repeated while the key is held (X11 sends a release and a press with the same time)
+        if key in self.held_keys or self.released_at.get(key) == event.time:
+            self.held_keys.add(key)
+            return
+        self.held_keys.add(key)
+        self.on_press(self.clock.timestamp(event.time), "key")
+
+    def key_release(self, event):
+        key = event.keysym.lower()
+        self.held_keys.discard(key)
+        self.released_at[key] = event.time
@@ -0,0 +1,83 @@
+"""
+Click sound engine for the CPS test.
+
+The click sound is decoded only once and then played from a fixed pool of reserved mixer channels. If every channel is busy, the oldest
+voice is stolen (or the click sound is dropped if stealing is disabled), so playing a click never allocates a new channel or decodes the file
+again.
+
+pygame is imported lazily and only pygame.mixer is initialised, the first time the sound is prepared (at the start of a test, when a custom
+sound is uploaded, or at the latest when it's first played), so starting the app doesn't pay for it.
+"""
+
+
+class SoundError(Exception):
+    """The click sound can't be decoded or played."""
+
+
+class SoundEngine:
+    def __init__(self, voices=4, steal=True, cache=None):
+        #Number of reserved channels, what to do when all of them are busy and the cache of preprocessed sounds (see soundcache.py)
+        self.voices = voices
+        self.steal = steal
+        self.cache = cache
+
+        #The path of the sound and the decoded sound (None until it's prepared)
+        self.path = None
+        self.sound = None
+
+        #The pool of reserved channels and the index of the oldest voice
+        self.channels = []
+        self.next_voice = 0
+
+    def reserve_channels(self):
+        """Initialise pygame.mixer and reserve the channels of the pool, so pygame never gives them to other sounds."""
+        import pygame.mixer
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+            if pygame.mixer.get_num_channels() < self.voices:
+                pygame.mixer.set_num_channels(self.voices)
+            pygame.mixer.set_reserved(self.voices)
+        except pygame.error as e:
+            raise SoundError(e) from e
+        self.channels = [pygame.mixer.Channel(i) for i in range(self.voices)]
+        self.next_voice = 0
+
+    def load(self, path):
+        """Set the sound to play. It isn't decoded until it's prepared."""
+        self.path = path
+        self.sound = None
+
+    def prepare(self):
+        """Decode the sound (or load it from the cache) if it isn't decoded yet. Raises SoundError if the file can't be read or
+        decoded."""
+        if self.sound is not None or self.path is None:
+            return
+        if not self.channels:
+            self.reserve_channels()
+        if self.cache is not None:
+            self.sound = self.cache.load(self.path)
+            return
+        import pygame.mixer
+        try:
+            self.sound = pygame.mixer.Sound(self.path)
+        except (pygame.error, OSError) as e:
+            raise SoundError(e) from e
+
+    def play(self):
+        """Play the cached sound on the pool. The voices are used in round-robin order, so the next voice is always the oldest one."""
+        if self.sound is None:
+            try:
+                self.prepare()
+            except (SoundError, OSError):
+                return
+            if self.sound is None:
+                return
+        channel = self.channels[self.next_voice]
+        if channel.get_busy():
+            if not self.steal:
+                #Drop the click sound instead of cutting the oldest one
+                return
+            channel.stop()
+        channel.play(self.sound)
+        self.next_voice = (self.next_voice + 1) % self.voices
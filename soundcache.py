@@ -0,0 +1,91 @@
+"""
+Content-addressed cache of preprocessed click sounds.
+
+The first time a click sound is used, it's validated, decoded and converted by pygame to the mixer's native format (sample rate, sample
+size and channels), and its leading silence is trimmed, so the click is heard as soon as it's played. The resulting raw samples are saved
+in the sound_cache folder, named after the SHA-256 hash of the original file and the mixer format. Later launches load the ready-to-play
+samples directly, without decoding the file again (which matters most for MP3 files).
+"""
+
+import hashlib, os
+from array import array
+
+from sound import SoundError
+
+#Array typecodes of the mixer's sample sizes (negative sizes are signed samples, 32 is float) and the value of silence
+SAMPLE_FORMATS = {
+    8: ("B", 128),
+    -8: ("b", 0),
+    16: ("H", 32768),
+    -16: ("h", 0),
+    32: ("f", 0.0),
+}
+
+
+def trim_leading_silence(raw, size, channels, threshold=0.01):
+    """Return the raw samples without the frames at the start whose samples are all within threshold (a fraction of the full scale) of
+    silence. If every frame is silent, the samples are returned unchanged."""
+    if size not in SAMPLE_FORMATS:
+        return raw
+    typecode, silence = SAMPLE_FORMATS[size]
+    full_scale = 1.0 if typecode == "f" else 1 << (abs(size) - 1)
+    limit = threshold * full_scale
+
+    samples = array(typecode)
+    samples.frombytes(raw[:len(raw) - len(raw) % samples.itemsize])
+    for index, sample in enumerate(samples):
+        if abs(sample - silence) > limit:
+            first_frame = index // channels
+            return raw[first_frame * channels * samples.itemsize:]
+    return raw
+
+
+class SoundCache:
+    def __init__(self, folder="sound_cache"):
+        self.folder = folder
+
+    def key(self, path, mixer_format):
+        """Name of the cached file of the sound at the path: the SHA-256 of its content and the mixer format."""
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1 << 16), b""):
+                digest.update(chunk)
+        frequency, size, channels = mixer_format
+        return f"{digest.hexdigest()}-{frequency}-{size}-{channels}.raw"
+
+    def load(self, path):
+        """Return a pygame Sound of the preprocessed click sound at the path, from the cache if it's there. pygame.mixer must be
+        initialised. Raises SoundError if the file can't be read (e.g. it's missing, a folder or not readable) or isn't a valid sound."""
+        import pygame.mixer
+        mixer_format = pygame.mixer.get_init()
+        try:
+            cached_path = os.path.join(self.folder, self.key(path, mixer_format))
+        except OSError as e:
+            raise SoundError(e) from e
+        try:
+            with open(cached_path, "rb") as file:
+                return pygame.mixer.Sound(buffer=file.read())
+        except OSError:
+            #Not cached yet (or the cached file can't be read), so it's decoded again
+            pass
+
+        #Validate and decode the file (pygame converts it to the mixer's format), then trim the leading silence
+        try:
+            raw = pygame.mixer.Sound(path).get_raw()
+        except (pygame.error, OSError) as e:
+            raise SoundError(e) from e
+        if not raw:
+            raise SoundError("The sound is empty")
+        _, size, channels = mixer_format
+        raw = trim_leading_silence(raw, size, channels)
+
+        #Save it atomically, so a crash never leaves a truncated sound in the cache (if it can't be saved, it's only used this time)
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            temporary_path = cached_path + ".tmp"
+            with open(temporary_path, "wb") as file:
+                file.write(raw)
+            os.replace(temporary_path, cached_path)
+        except OSError:
+            pass
+        return pygame.mixer.Sound(buffer=raw)
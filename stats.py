@@ -0,0 +1,110 @@
+"""
+Incrementally maintained statistics of the finished tests.
+
+Instead of scanning the whole history every time the statistics window is opened, SessionStats keeps running aggregates that are updated
+in O(1) when a test finishes: the number of tests, clicks and seconds clicked and the CPS sum (for the averages), the number of tests,
+CPS sum and best CPS of each duration, the number of tests in each award tier and the CPS of the last tests (for the trend line). Each
+profile has its own aggregates, saved with the profile in profiles.db, so the window opens instantly no matter how long the history is,
+and nothing has to be rebuilt at startup.
+"""
+
+from collections import deque
+
+#Number of recent tests shown in the trend line
+TREND_POINTS = 50
+
+#Tier counts key of the tests below the first tier
+NO_TIER = ""
+
+
+class SessionStats:
+    def __init__(self, trend_points=TREND_POINTS):
+        #Totals of every test
+        self.tests = 0
+        self.clicks = 0
+        self.seconds = 0.0
+        self.total_cps = 0.0
+
+        #{duration: [tests, CPS sum, best CPS]}, {award name: tests} and the CPS of the last tests
+        self.durations = {}
+        self.tiers = {}
+        self.recent = deque(maxlen=trend_points)
+
+    def add(self, duration, click_count, cps, award=None):
+        """Add a finished test. award is the Award of the tier the CPS falls into (None if it's below the first tier)."""
+        self.tests += 1
+        self.clicks += click_count
+        self.seconds += duration
+        self.total_cps += cps
+
+        aggregate = self.durations.setdefault(duration, [0, 0.0, 0.0])
+        aggregate[0] += 1
+        aggregate[1] += cps
+        aggregate[2] = max(aggregate[2], cps)
+
+        tier = award.name if award else NO_TIER
+        self.tiers[tier] = self.tiers.get(tier, 0) + 1
+        self.recent.append(cps)
+
+    def average_cps(self):
+        """Average CPS of every test."""
+        return self.total_cps / self.tests if self.tests else 0.0
+
+    def per_duration(self):
+        """Return a list of (duration, tests, average CPS, best CPS) tuples, sorted by duration."""
+        return [(duration, tests, total_cps / tests, best)
+                for duration, (tests, total_cps, best) in sorted(self.durations.items())]
+
+    def trend(self):
+        """Return the (slope, intercept) of the least squares line through the CPS of the last tests (the slope is in CPS per test)."""
+        count = len(self.recent)
+        if count < 2:
+            return 0.0, self.recent[0] if self.recent else 0.0
+        mean_x = (count - 1) / 2
+        mean_y = sum(self.recent) / count
+        covariance = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(self.recent))
+        variance = sum((x - mean_x) ** 2 for x in range(count))
+        slope = covariance / variance
+        return slope, mean_y - slope * mean_x
+
+    def to_dict(self):
+        """Return the aggregates as a JSON-serializable dictionary (durations are stored as a list, since JSON keys must be strings)."""
+        return {
+            "tests": self.tests,
+            "clicks": self.clicks,
+            "seconds": self.seconds,
+            "total_cps": self.total_cps,
+            "durations": [[duration] + aggregate for duration, aggregate in sorted(self.durations.items())],
+            "tiers": self.tiers,
+            "recent": list(self.recent),
+        }
+
+    @classmethod
+    def from_dict(cls, data, trend_points=TREND_POINTS):
+        """Load the aggregates saved by to_dict(). Raises ValueError if they're malformed."""
+        stats = cls(trend_points)
+        try:
+            stats.tests = int(data.get("tests", 0))
+            stats.clicks = int(data.get("clicks", 0))
+            stats.seconds = float(data.get("seconds", 0.0))
+            stats.total_cps = float(data.get("total_cps", 0.0))
+            stats.durations = {float(duration): [int(tests), float(total_cps), float(best)]
+                               for duration, tests, total_cps, best in data.get("durations", [])}
+            stats.tiers = {str(tier): int(count) for tier, count in data.get("tiers", {}).items()}
+            stats.recent.extend(float(cps) for cps in data.get("recent", []))
+        except (AttributeError, TypeError, ValueError) as e:
+            raise ValueError(f"Malformed statistics: {e!r}") from e
+        return stats
+
+    @classmethod
+    def from_history(cls, history, award_registry, trend_points=TREND_POINTS):
+        """Build the aggregates from every session of the history (a SessionHistory). Only needed once, when there aren't any saved
+        aggregates yet (the first launch after updating)."""
+        stats = cls(trend_points)
+        stats.add_history(history, award_registry)
+        return stats
+
+    def add_history(self, history, award_registry, after_id=0):
+        """Add the sessions of the history with an id greater than after_id (e.g. the ones just imported)."""
+        for session in history.sessions(after_id):
+            self.add(session.duration, session.click_count, session.cps, award_registry.award_for(session.cps))
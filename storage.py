@@ -0,0 +1,146 @@
+"""
+Crash-safe persistence of the user's configuration (config.json).
+
+The configuration is written to a temporary file, flushed to disk with fsync and then renamed over the original, so a crash or a full disk
+in the middle of a write never leaves a truncated config.json behind. Saves requested in quick succession are coalesced into a single write
+(debounce). Every time the configuration is loaded successfully, a snapshot is kept in config.json.bak, which is used if config.json is
+corrupt. The configuration has a schema version, and older versions are migrated when they're loaded.
+"""
+
+import json, os
+
+#Current version of the configuration schema
+SCHEMA_VERSION = 2
+
+
+def migrate_0_to_1(data):
+    """Version 0 (before the schema version was added) has the same fields as version 1."""
+    return data
+
+
+def migrate_1_to_2(data):
+    """Version 2 stores the awards and highest score in profiles.db, under the profile named in "profile". The old values are kept, so
+    they're moved into the profile when it's first loaded."""
+    data.setdefault("profile", "Default")
+    return data
+
+
+#Functions that migrate the configuration from the version in the key to the next one
+MIGRATIONS = {
+    0: migrate_0_to_1,
+    1: migrate_1_to_2,
+}
+
+
+def config_value(data, key, default, types, check=None):
+    """Return data[key] if it's one of the types (booleans only count as bool, not as int) and passes the check, else the default, so a
+    mistyped value in config.json falls back to its default instead of breaking the app."""
+    value = data.get(key, default)
+    allowed = types if isinstance(types, tuple) else (types,)
+    if not isinstance(value, allowed) or (isinstance(value, bool) and bool not in allowed):
+        return default
+    if check is not None and not check(value):
+        return default
+    return value
+
+
+def write_atomic(path, data):
+    """Write the data as JSON to a temporary file, fsync it and rename it over the path."""
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w") as file:
+        json.dump(data, file, indent=4)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+    #Make sure the rename itself is on disk (not possible on Windows)
+    if hasattr(os, "O_DIRECTORY"):
+        folder = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(folder)
+        finally:
+            os.close(folder)
+
+
+class ConfigStore:
+    def __init__(self, path="config.json", widget=None, delay=500):
+        #Path of the configuration, the Tk widget used to schedule debounced saves and the debounce delay in milliseconds
+        self.path = path
+        self.backup_path = path + ".bak"
+        self.widget = widget
+        self.delay = delay
+
+        #Identifier of the pending debounced save and the function that gives the data to save
+        self.pending_id = None
+        self.pending_data = None
+
+    def read(self, path):
+        """Read and migrate the configuration at the given path. Raises OSError or ValueError if it can't be read."""
+        with open(path, "r") as file:
+            data = json.load(file)
+        if not isinstance(data, dict):
+            raise ValueError("The configuration must be a JSON object")
+        try:
+            return self.migrate(data)
+        except (TypeError, KeyError) as e:
+            raise ValueError(f"The configuration can't be migrated: {e!r}") from e
+
+    def migrate(self, data):
+        """Migrate the configuration to the current schema version. Raises ValueError if the version isn't valid."""
+        version = data.get("version", 0)
+        if type(version) is not int or version < 0:
+            raise ValueError(f"Invalid configuration version: {version!r}")
+        while version < SCHEMA_VERSION:
+            data = MIGRATIONS[version](data)
+            version += 1
+        data["version"] = version
+        return data
+
+    def load(self):
+        """Load the configuration. If config.json is missing or corrupt, the last good snapshot is used, and if there isn't any, an
+        empty dictionary is returned (so the defaults are used)."""
+        try:
+            data = self.read(self.path)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError):
+            try:
+                return self.read(self.backup_path)
+            except (OSError, ValueError):
+                return {}
+
+        #Keep a snapshot of the last good configuration
+        try:
+            write_atomic(self.backup_path, data)
+        except OSError:
+            pass
+        return data
+
+    def save(self, data):
+        """Save the configuration now, cancelling any pending debounced save."""
+        self.cancel()
+        data = dict(data, version=SCHEMA_VERSION)
+        write_atomic(self.path, data)
+
+    def save_later(self, get_data):
+        """Save the configuration after the debounce delay. Calling this again before the delay restarts it, so quick successive changes
+        cause a single write. get_data is called when the save actually happens."""
+        if self.widget is None:
+            self.save(get_data())
+            return
+        self.cancel()
+        self.pending_data = get_data
+        self.pending_id = self.widget.after(self.delay, self.flush)
+
+    def flush(self):
+        """Save now if there's a pending debounced save."""
+        get_data = self.pending_data
+        if get_data is not None:
+            self.save(get_data())
+
+    def cancel(self):
+        """Cancel the pending debounced save."""
+        if self.pending_id is not None:
+            self.widget.after_cancel(self.pending_id)
+        self.pending_id = None
+        self.pending_data = None
@@ -0,0 +1,62 @@
+"""Tests of the streaming autoclicker detector (detector.py). Run with: python -m unittest discover tests"""
+
+import os, random, sys, unittest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from detector import StreamingDetector
+
+NS_PER_SECOND = 1_000_000_000
+
+
+def jittered_stream(cps, clicks=60, jitter=0.2, seed=0):
+    """Human-like clicks: intervals around 1 / cps seconds with a Gaussian standard deviation of jitter times the interval."""
+    rng = random.Random(seed)
+    interval = NS_PER_SECOND / cps
+    timestamps, now = [], 0.0
+    for _ in range(clicks):
+        timestamps.append(round(now))
+        now += max(1.0, rng.gauss(interval, jitter * interval))
+    return timestamps
+
+
+def flagged(timestamps):
+    detector = StreamingDetector()
+    for timestamp in timestamps:
+        detector.add(timestamp)
+    return detector.flagged
+
+
+class StreamingDetectorTest(unittest.TestCase):
+    def test_slow_jittered_clicking_is_not_flagged(self):
+        for cps in (2, 3, 3.5, 4, 5):
+            for seed in range(10):
+                with self.subTest(cps=cps, seed=seed):
+                    self.assertIsNone(flagged(jittered_stream(cps, seed=seed)))
+
+    def test_fast_jittered_clicking_is_not_flagged(self):
+        for cps in (10, 20, 40):
+            with self.subTest(cps=cps):
+                self.assertIsNone(flagged(jittered_stream(cps)))
+
+    def test_constant_pace_is_flagged(self):
+        for cps in (5, 100, 1000):
+            with self.subTest(cps=cps):
+                self.assertIn("too regular", flagged(jittered_stream(cps, jitter=0.001)))
+
+    def test_alternating_intervals_are_flagged(self):
+        #Two fixed intervals vary a lot but are perfectly predictable
+        timestamps, now = [], 0
+        for index in range(60):
+            timestamps.append(now)
+            now += 50_000_000 if index % 2 else 150_000_000
+        self.assertIn("too predictable", flagged(timestamps))
+
+    def test_earlier_timestamp_does_not_raise(self):
+        detector = StreamingDetector()
+        detector.add(NS_PER_SECOND)
+        detector.add(NS_PER_SECOND - 300_000_000)
+        self.assertEqual(detector.mean, 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+Event-driven timer for the CPS test.
+
+Instead of polling the clock every few milliseconds for the whole life of the app, the timer arms a single deadline callback when the test
+starts, and runs a separate redraw pass (rate limited by the update delay) only while a test is active. Nothing is scheduled while the app
+is idle. The timer also measures how late the deadline callback fired compared to the scheduled end of the test.
+"""
+
+import time
+
+
+class TestTimer:
+    def __init__(self, widget, on_deadline, on_redraw, redraw_delay=10):
+        #The Tk widget used to schedule the callbacks and the callbacks themselves
+        self.widget = widget
+        self.on_deadline = on_deadline
+        self.on_redraw = on_redraw
+        self.redraw_delay = redraw_delay
+
+        #Pending "after" identifiers and the scheduled end of the test (in perf_counter seconds)
+        self.deadline_id = None
+        self.redraw_id = None
+        self.deadline = None
+        self.active = False
+
+        #Lateness instrumentation (in seconds)
+        self.last_lateness = None
+        self.worst_lateness = 0.0
+        self.total_lateness = 0.0
+        self.deadlines_fired = 0
+
+    def start(self, duration, start=None):
+        """Start the timer. If the duration is zero the test is infinite, so only the redraw pass is started. The start time is a
+        time.perf_counter() value and defaults to now."""
+        self.cancel()
+        self.active = True
+        if start is None:
+            start = time.perf_counter()
+        if duration > 0:
+            self.deadline = start + duration
+            delay = max(0, round((self.deadline - time.perf_counter()) * 1000))
+            self.deadline_id = self.widget.after(delay, self._fire_deadline)
+        self.redraw_id = self.widget.after(self.redraw_delay, self._redraw)
+
+    def cancel(self):
+        """Stop the timer without calling the deadline callback."""
+        self.active = False
+        self.deadline = None
+        if self.deadline_id is not None:
+            self.widget.after_cancel(self.deadline_id)
+            self.deadline_id = None
+        if self.redraw_id is not None:
+            self.widget.after_cancel(self.redraw_id)
+            self.redraw_id = None
+
+    def _fire_deadline(self):
+        """Called by Tk when the deadline has been reached."""
+        self.deadline_id = None
+        now = time.perf_counter()
+        if now < self.deadline:
+            #Tk rounds the delay to whole milliseconds, so wait for the remaining fraction
+            self.deadline_id = self.widget.after(1, self._fire_deadline)
+            return
+
+        #Record how late the callback fired
+        self.last_lateness = now - self.deadline
+        self.worst_lateness = max(self.worst_lateness, self.last_lateness)
+        self.total_lateness += self.last_lateness
+        self.deadlines_fired += 1
+
+        self.cancel()
+        self.on_deadline()
+
+    def _redraw(self):
+        """Redraw pass, repeated every redraw_delay milliseconds while the test is active."""
+        self.redraw_id = None
+        if not self.active:
+            return
+        self.on_redraw()
+        self.redraw_id = self.widget.after(self.redraw_delay, self._redraw)
+
+    def report(self):
+        """Return a short text describing how late the end of the tests was detected."""
+        if not self.deadlines_fired:
+            return "End-of-test lateness: no finished tests yet"
+        mean = self.total_lateness / self.deadlines_fired
+        return "End-of-test lateness: last {:.2f} ms, mean {:.2f} ms, worst {:.2f} ms ({} tests)".format(
+            self.last_lateness * 1000, mean * 1000, self.worst_lateness * 1000, self.deadlines_fired)